@@ -489,9 +489,10 @@ def backfill(
     try:
         logger.info(f"Starting backfill for user {user_id}")
         
-        # Parse and validate date range
-        start_dt, end_dt = parse_date_range(start_date, end_date)
-        validate_date_range(start_dt, end_dt, max_messages)
+        # Parse and validate date range against a single reference time
+        now = datetime.now(timezone.utc)
+        start_dt, end_dt = parse_date_range(start_date, end_date, now=now)
+        validate_date_range(start_dt, end_dt, max_messages, now=now)
         
         # Parse labels
         label_list = [label.strip() for label in labels.split(",") if label.strip()] if labels else []
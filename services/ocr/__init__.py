@@ -5,7 +5,8 @@ from .interface import (
     OCRError, 
     OCRConfigurationError, 
     OCRProcessingError, 
-    OCRTimeoutError
+    OCRTimeoutError,
+    OCRThrottledError
 )
 from .pytesseract_service import PytesseractOCRService
 from .paddleocr_service import PaddleOCRService
@@ -23,6 +24,7 @@ __all__ = [
     "OCRConfigurationError", 
     "OCRProcessingError",
     "OCRTimeoutError",
+    "OCRThrottledError",
     "PytesseractOCRService",
     "PaddleOCRService", 
     "OpenSourceOCRFactory",
@@ -119,3 +119,8 @@ class OCRProcessingError(OCRError):
 class OCRTimeoutError(OCRError):
     """Raised when OCR processing times out."""
     pass
+
+
+class OCRThrottledError(OCRError):
+    """Raised when the OCR provider keeps throttling requests after retries."""
+    pass
@@ -173,7 +173,7 @@ class PytesseractOCRService(OCRServiceInterface):
                     'word_count': word_count,
                     'average_confidence': average_confidence,
                     'table_count': 0,
-                    'latency_ms': timer.start_time and (time.time() - timer.start_time) * 1000 or 0
+                    'latency_ms': timer.start_ns and (time.perf_counter_ns() - timer.start_ns) / 1_000_000 or 0
                 }
             }
 
@@ -200,7 +200,7 @@ class PytesseractOCRService(OCRServiceInterface):
             record_ocr_metrics(
                 engine="pytesseract",
                 success=False,
-                latency_ms=timer.start_time and (time.time() - timer.start_time) * 1000 or 0
+                latency_ms=timer.start_ns and (time.perf_counter_ns() - timer.start_ns) / 1_000_000 or 0
             )
 
             log_ocr_operation(
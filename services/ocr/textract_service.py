@@ -3,8 +3,12 @@
 import os
 import io
 import json
+import time
+import random
+import asyncio
+import functools
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union, ClassVar, FrozenSet
 import logging
 
 import boto3
@@ -14,19 +18,68 @@ from textractor.data.constants import TextractFeatures
 from textractor.exceptions import InvalidParameterError
 from PIL import Image
 
-from .interface import OCRServiceInterface, OCRError, OCRConfigurationError, OCRProcessingError
+from .interface import (
+    OCRServiceInterface, OCRError, OCRConfigurationError, OCRProcessingError, OCRThrottledError
+)
 from ..blob_storage.service import BlobStorageService
 from ...config.settings import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Feature names accepted by analyze_document mapped to Textract enums
+_FEATURE_MAP = {
+    'tables': TextractFeatures.TABLES,
+    'forms': TextractFeatures.FORMS,
+    'layout': TextractFeatures.LAYOUT,
+    'queries': TextractFeatures.QUERIES,
+    'signatures': TextractFeatures.SIGNATURES
+}
+
+# ClientError codes Textract returns when request quotas are exceeded
+_THROTTLING_ERROR_CODES = frozenset({
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'LimitExceededException'
+})
+
+
+@functools.lru_cache(maxsize=8)
+def _get_session(profile: Optional[str], region: Optional[str]) -> boto3.Session:
+    """Return a shared boto3 session for the given profile/region.
+
+    Credential resolution walks the provider chain (env, config files, IMDS),
+    so sessions are reused across service instances instead of rebuilt.
+    """
+    return boto3.Session(profile_name=profile, region_name=region)
+
+
+def _build_textractor(region: Optional[str]) -> Textractor:
+    """Create a Textractor client for a region."""
+    kwargs = {}
+    if region:
+        kwargs['region_name'] = region
+    return Textractor(**kwargs)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_textractor(region: Optional[str]) -> Textractor:
+    """Return a Textractor shared by all service instances for a region.
+
+    Reusing one client keeps its HTTPS connection pool warm across instances.
+    """
+    return _build_textractor(region)
+
 
 class TextractOCRService(OCRServiceInterface):
     """AWS Textract OCR service implementation."""
     
-    SUPPORTED_FORMATS = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.tif'}
+    SUPPORTED_FORMATS: ClassVar[FrozenSet[str]] = frozenset({'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.tif'})
     MAX_SYNC_FILE_SIZE = 5 * 1024 * 1024  # 5MB for synchronous processing
+    _SUPPORTED_FEATURES: ClassVar[Tuple[str, ...]] = ('tables', 'forms', 'layout', 'queries', 'signatures')
+    THROTTLE_MAX_ATTEMPTS = 6
+    THROTTLE_BASE_DELAY = 5  # seconds; grows 3x per attempt
+    THROTTLE_MAX_DELAY = 405  # seconds
     
     def __init__(self, blob_storage: Optional[BlobStorageService] = None):
         """Initialize Textract OCR service.
@@ -42,7 +95,12 @@ class TextractOCRService(OCRServiceInterface):
         """Validate AWS configuration."""
         try:
             # Test AWS credentials
-            boto3.Session().get_credentials()
+            if settings.AWS_SESSION_TOKEN:
+                # Temporary credentials expire, so never share them via the cache
+                session = boto3.Session(region_name=settings.AWS_REGION)
+            else:
+                session = _get_session(os.environ.get('AWS_PROFILE'), settings.AWS_REGION)
+            session.get_credentials()
         except NoCredentialsError:
             raise OCRConfigurationError(
                 "AWS credentials not found. Please configure AWS credentials.",
@@ -53,21 +111,27 @@ class TextractOCRService(OCRServiceInterface):
     def textractor(self) -> Textractor:
         """Get or create Textractor instance."""
         if self._textractor is None:
-            kwargs = {}
-            if settings.AWS_REGION:
-                kwargs['region_name'] = settings.AWS_REGION
-            
-            self._textractor = Textractor(**kwargs)
+            if settings.AWS_SESSION_TOKEN:
+                # Temporary credentials expire, so never share them via the cache
+                self._textractor = _build_textractor(settings.AWS_REGION)
+            else:
+                self._textractor = _get_textractor(settings.AWS_REGION)
         
         return self._textractor
     
-    def analyze_document(self, document_path: Path, features: Optional[List[str]] = None) -> Dict[str, Any]:
+    def analyze_document(
+        self,
+        document_path: Path,
+        features: Optional[List[str]] = None,
+        size_bytes: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Analyze a document using AWS Textract.
         
         Args:
             document_path: Path to the document file
             features: List of features to enable (e.g., ['tables', 'forms', 'layout'])
+            size_bytes: Known document size; skips the stat() call when provided
         
         Returns:
             Dictionary containing structured results
@@ -77,7 +141,8 @@ class TextractOCRService(OCRServiceInterface):
         """
         try:
             # Validate file format
-            if document_path.suffix.lower() not in self.SUPPORTED_FORMATS:
+            suffix = document_path.suffix.lower()
+            if suffix not in self.SUPPORTED_FORMATS:
                 raise OCRProcessingError(
                     f"Unsupported file format: {document_path.suffix}. "
                     f"Supported formats: {', '.join(self.SUPPORTED_FORMATS)}",
@@ -88,7 +153,7 @@ class TextractOCRService(OCRServiceInterface):
             textract_features = self._convert_features(features or [])
             
             # Determine if we need async processing
-            file_size = document_path.stat().st_size
+            file_size = size_bytes if size_bytes is not None else document_path.stat().st_size
             use_async = file_size > self.MAX_SYNC_FILE_SIZE
             
             logger.info(
@@ -97,10 +162,8 @@ class TextractOCRService(OCRServiceInterface):
             )
             
             # Process document
-            if use_async:
-                document = self._process_async(document_path, textract_features)
-            else:
-                document = self._process_sync(document_path, textract_features)
+            process = self._process_async if use_async else self._process_sync
+            document = self._call_with_throttle_retry(process, document_path, textract_features)
             
             # Extract structured data
             result = self._extract_structured_data(document)
@@ -115,6 +178,8 @@ class TextractOCRService(OCRServiceInterface):
             
             return result
             
+        except OCRError:
+            raise
         except (InvalidParameterError, ClientError) as e:
             raise OCRProcessingError(
                 f"Textract processing failed: {str(e)}",
@@ -128,23 +193,65 @@ class TextractOCRService(OCRServiceInterface):
                 original_error=e
             )
     
+    async def analyze_documents(
+        self,
+        document_paths: List[Path],
+        features: Optional[List[str]] = None,
+        max_concurrency: int = 10,
+        rps: float = 10.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several documents concurrently.
+        
+        Each document goes through analyze_document in the default executor.
+        At most max_concurrency calls are in flight, and dispatches are spaced
+        so no more than rps requests per second reach Textract.
+        
+        Args:
+            document_paths: Paths to the document files
+            features: List of features to enable for every document
+            max_concurrency: Maximum number of concurrent Textract calls
+            rps: Maximum Textract requests started per second
+        
+        Returns:
+            Analysis results in the same order as document_paths
+        
+        Raises:
+            OCRError: If analysis of any document fails
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        rate_lock = asyncio.Lock()
+        min_interval = 1.0 / rps if rps > 0 else 0.0
+        last_dispatch = 0.0
+        
+        async def analyze_one(document_path: Path) -> Dict[str, Any]:
+            nonlocal last_dispatch
+            async with semaphore:
+                async with rate_lock:
+                    wait = min_interval - (time.monotonic() - last_dispatch)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    last_dispatch = time.monotonic()
+                return await loop.run_in_executor(
+                    None, functools.partial(self.analyze_document, document_path, features)
+                )
+        
+        return list(await asyncio.gather(*(analyze_one(path) for path in document_paths)))
+    
     def _convert_features(self, features: List[str]) -> List[TextractFeatures]:
         """Convert feature strings to Textract feature enums."""
-        feature_mapping = {
-            'tables': TextractFeatures.TABLES,
-            'forms': TextractFeatures.FORMS,
-            'layout': TextractFeatures.LAYOUT,
-            'queries': TextractFeatures.QUERIES,
-            'signatures': TextractFeatures.SIGNATURES
-        }
-        
         textract_features = []
+        unknown_features = []
         for feature in features:
-            feature_lower = feature.lower()
-            if feature_lower in feature_mapping:
-                textract_features.append(feature_mapping[feature_lower])
+            textract_feature = _FEATURE_MAP.get(feature.lower())
+            if textract_feature is not None:
+                textract_features.append(textract_feature)
             else:
-                logger.warning(f"Unknown feature: {feature}")
+                unknown_features.append(feature)
+        
+        if unknown_features:
+            logger.warning(f"Unknown features: {', '.join(unknown_features)}")
         
         # Default to TABLES and FORMS if no features specified
         if not textract_features:
@@ -152,10 +259,37 @@ class TextractOCRService(OCRServiceInterface):
         
         return textract_features
     
+    def _call_with_throttle_retry(self, func, *args):
+        """Call a Textract operation, backing off while requests are throttled.
+        
+        Raises:
+            OCRThrottledError: If Textract is still throttling after the last attempt
+        """
+        for attempt in range(self.THROTTLE_MAX_ATTEMPTS):
+            try:
+                return func(*args)
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code')
+                if error_code not in _THROTTLING_ERROR_CODES:
+                    raise
+                if attempt == self.THROTTLE_MAX_ATTEMPTS - 1:
+                    raise OCRThrottledError(
+                        f"Textract throttled after {self.THROTTLE_MAX_ATTEMPTS} attempts: {str(e)}",
+                        service_name="textract",
+                        original_error=e
+                    )
+                delay = min(self.THROTTLE_BASE_DELAY * (3 ** attempt), self.THROTTLE_MAX_DELAY)
+                delay += random.uniform(0, self.THROTTLE_BASE_DELAY)
+                logger.warning(
+                    f"Textract throttled ({error_code}), retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{self.THROTTLE_MAX_ATTEMPTS})"
+                )
+                time.sleep(delay)
+    
     def _process_sync(self, document_path: Path, features: List[TextractFeatures]):
         """Process document synchronously."""
         return self.textractor.analyze_document(
-            file_source=str(document_path),
+            file_source=os.fspath(document_path),
             features=features,
             save_image=True
         )
@@ -171,7 +305,7 @@ class TextractOCRService(OCRServiceInterface):
         s3_upload_path = f"s3://{settings.TEXTRACT_S3_BUCKET}/{settings.TEXTRACT_S3_PREFIX}"
         
         return self.textractor.start_document_analysis(
-            file_source=str(document_path),
+            file_source=os.fspath(document_path),
             features=features,
             s3_upload_path=s3_upload_path,
             save_image=True
@@ -270,18 +404,26 @@ class TextractOCRService(OCRServiceInterface):
         tables = analysis_result.get('tables', [])
         key_value_pairs = analysis_result.get('key_value_pairs', [])
         
-        total_words = sum(page.get('word_count', 0) for page in pages)
-        total_lines = sum(page.get('line_count', 0) for page in pages)
+        total_words = 0
+        total_lines = 0
+        for page in pages:
+            total_words += page.get('word_count', 0)
+            total_lines += page.get('line_count', 0)
         
         # Calculate average confidence for key-value pairs
-        confidences = []
+        confidence_sum = 0.0
+        confidence_count = 0
         for kv in key_value_pairs:
-            if kv.get('key_confidence'):
-                confidences.append(kv['key_confidence'])
-            if kv.get('value_confidence'):
-                confidences.append(kv['value_confidence'])
+            key_confidence = kv.get('key_confidence')
+            if key_confidence:
+                confidence_sum += key_confidence
+                confidence_count += 1
+            value_confidence = kv.get('value_confidence')
+            if value_confidence:
+                confidence_sum += value_confidence
+                confidence_count += 1
         
-        avg_confidence = sum(confidences) / len(confidences) if confidences else None
+        avg_confidence = confidence_sum / confidence_count if confidence_count else None
         
         return {
             'page_count': len(pages),
@@ -294,7 +436,8 @@ class TextractOCRService(OCRServiceInterface):
     
     def get_supported_features(self) -> List[str]:
         """Get list of supported features for AWS Textract."""
-        return ['tables', 'forms', 'layout', 'queries', 'signatures']
+        # Fresh list per call so callers cannot mutate the shared constant
+        return list(self._SUPPORTED_FEATURES)
 
 
 def create_textract_service(blob_storage: Optional[BlobStorageService] = None) -> TextractOCRService:
@@ -14,6 +14,7 @@ from utils.logging import (
     log_function_exit,
     log_error,
     log_api_request,
+    is_enabled_for,
     log_ocr_operation,
     log_workflow_step,
     log_performance_metric,
@@ -73,6 +74,18 @@ class TestSensitiveDataRedactor:
         assert redacted['nested']['password'] == '[REDACTED_PASSWORD]'
         assert redacted['nested']['safe'] == 'value'
 
+    def test_redact_cyclic_dictionary(self):
+        """Test self-referencing dictionaries are redacted without looping forever."""
+        data = {'user': 'test@example.com', 'children': []}
+        data['self'] = data
+        data['children'].append(data)
+
+        redacted = SensitiveDataRedactor.redact_dict(data)
+
+        assert redacted['user'] == '[REDACTED_EMAIL]'
+        assert redacted['self'] is redacted
+        assert redacted['children'][0] is redacted
+
     def test_skip_metadata_fields(self):
         """Test that metadata fields are not redacted."""
         data = {
@@ -184,6 +197,29 @@ class TestLoggingConfiguration:
             user_id="user123"
         )
 
+    def test_log_api_request_non_stdlib_structlog(self):
+        """Test helpers still log through structlog's default, non-stdlib wrapper."""
+        saved_config = structlog.get_config()
+        structlog.reset_defaults()
+        try:
+            logger = get_logger("test")
+            assert is_enabled_for(logger, logging.INFO)
+
+            with structlog.testing.capture_logs() as captured:
+                log_api_request(logger, 'GET', '/api/test', 200)
+
+            assert [entry["event"] for entry in captured] == ["API request"]
+        finally:
+            structlog.configure(**saved_config)
+
+    def test_is_enabled_for_stdlib_logger(self):
+        """Test stdlib loggers are gated by their effective level."""
+        logger = logging.getLogger("test.is_enabled_for")
+        logger.setLevel(logging.WARNING)
+
+        assert not is_enabled_for(logger, logging.INFO)
+        assert is_enabled_for(logger, logging.ERROR)
+
     def test_log_ocr_operation(self):
         """Test OCR operation logging."""
         mock_logger = MagicMock()
@@ -12,6 +12,7 @@ from utils.metrics import (
     MetricsTimer,
     get_metrics_collector,
     record_ocr_metrics,
+    LATENCY_RESERVOIR_SIZE,
 )
 
 
@@ -25,11 +26,12 @@ class TestOCRMetrics:
         assert metrics.requests == 0
         assert metrics.successful_requests == 0
         assert metrics.failed_requests == 0
-        assert metrics.latencies_ms == []
-        assert metrics.pages_processed == []
-        assert metrics.words_extracted == []
-        assert metrics.costs == []
-        assert metrics.confidence_scores == []
+        assert metrics.latency_count == 0
+        assert len(metrics.latency_samples) == 0
+        assert metrics.total_pages == 0
+        assert metrics.total_words == 0
+        assert metrics.total_cost == 0.0
+        assert metrics.confidence_count == 0
 
     def test_add_request_success(self):
         """Test adding successful request."""
@@ -57,7 +59,8 @@ class TestOCRMetrics:
         metrics.add_latency(100.0)
         metrics.add_latency(200.0)
 
-        assert metrics.latencies_ms == [100.0, 200.0]
+        assert metrics.latency_count == 2
+        assert list(metrics.latency_samples) == [100.0, 200.0]
         assert metrics.avg_latency == 150.0
 
     def test_add_pages_processed(self):
@@ -66,7 +69,8 @@ class TestOCRMetrics:
         metrics.add_pages_processed(5)
         metrics.add_pages_processed(10)
 
-        assert metrics.pages_processed == [5, 10]
+        assert metrics.pages_count == 2
+        assert metrics.total_pages == 15
         assert metrics.avg_pages_per_request == 7.5
 
     def test_add_words_extracted(self):
@@ -75,7 +79,8 @@ class TestOCRMetrics:
         metrics.add_words_extracted(100)
         metrics.add_words_extracted(200)
 
-        assert metrics.words_extracted == [100, 200]
+        assert metrics.words_count == 2
+        assert metrics.total_words == 300
         assert metrics.avg_words_per_request == 150.0
 
     def test_add_cost(self):
@@ -84,7 +89,8 @@ class TestOCRMetrics:
         metrics.add_cost(0.50)
         metrics.add_cost(1.00)
 
-        assert metrics.costs == [0.50, 1.00]
+        assert metrics.cost_count == 2
+        assert metrics.total_cost == 1.50
         assert metrics.avg_cost == 0.75
 
     def test_add_confidence(self):
@@ -93,8 +99,8 @@ class TestOCRMetrics:
         metrics.add_confidence(0.85)
         metrics.add_confidence(0.95)
 
-        assert metrics.confidence_scores == [0.85, 0.95]
-        assert metrics.avg_confidence == 0.90
+        assert metrics.confidence_count == 2
+        assert metrics.avg_confidence == pytest.approx(0.90)
 
     def test_latency_p95(self):
         """Test 95th percentile latency calculation."""
@@ -107,6 +113,37 @@ class TestOCRMetrics:
         # 95th percentile should be around 95
         assert 94 <= metrics.latency_p95 <= 96
 
+    def test_latency_samples_bounded(self):
+        """Test latency samples stay bounded while averages stay exact."""
+        metrics = OCRMetrics()
+        for latency in range(LATENCY_RESERVOIR_SIZE * 3):
+            metrics.add_latency(float(latency))
+
+        assert len(metrics.latency_samples) == LATENCY_RESERVOIR_SIZE
+        assert metrics.latency_count == LATENCY_RESERVOIR_SIZE * 3
+        assert metrics.avg_latency == pytest.approx((LATENCY_RESERVOIR_SIZE * 3 - 1) / 2)
+
+    def test_merge(self):
+        """Test merging metrics keeps counters exact and reservoirs bounded."""
+        metrics = OCRMetrics()
+        other = OCRMetrics()
+        for latency in range(LATENCY_RESERVOIR_SIZE):
+            metrics.add_latency(1.0)
+            other.add_latency(3.0)
+        metrics.add_request(success=True)
+        other.add_request(success=False)
+        other.add_cost(0.25)
+
+        metrics.merge(other)
+
+        assert metrics.requests == 2
+        assert metrics.failed_requests == 1
+        assert metrics.total_cost == 0.25
+        assert metrics.latency_count == LATENCY_RESERVOIR_SIZE * 2
+        assert metrics.avg_latency == 2.0
+        assert len(metrics.latency_samples) == LATENCY_RESERVOIR_SIZE
+        assert list(metrics.latency_samples).count(1.0) == LATENCY_RESERVOIR_SIZE // 2
+
     def test_to_dict(self):
         """Test converting metrics to dictionary."""
         metrics = OCRMetrics()
@@ -129,6 +166,20 @@ class TestOCRMetrics:
         assert result["avg_cost_cents"] == 0.50
         assert result["avg_confidence"] == 0.85
 
+    def test_to_dict_cached_until_new_samples(self):
+        """Test to_dict is recomputed only after new samples arrive."""
+        metrics = OCRMetrics()
+        metrics.add_request(success=True)
+
+        first = metrics.to_dict()
+        first["requests"] = 99  # callers get a copy, not the cache
+        assert metrics.to_dict()["requests"] == 1
+
+        metrics.add_request(success=False)
+        result = metrics.to_dict()
+        assert result["requests"] == 2
+        assert result["failed_requests"] == 1
+
 
 class TestMetricsCollector:
     """Test metrics collector functionality."""
@@ -140,6 +191,7 @@ class TestMetricsCollector:
 
     def teardown_method(self):
         """Clean up test environment."""
+        self.collector.close()
         # Remove test files
         if os.path.exists(os.path.join(self.temp_dir, "ocr_metrics.json")):
             os.remove(os.path.join(self.temp_dir, "ocr_metrics.json"))
@@ -184,6 +236,7 @@ class TestMetricsCollector:
         self.collector.ocr_metrics["test_engine"].add_request(success=True)
 
         self.collector._save_metrics()
+        self.collector.flush()
 
         metrics_file = os.path.join(self.temp_dir, "ocr_metrics.json")
         assert os.path.exists(metrics_file)
@@ -193,6 +246,91 @@ class TestMetricsCollector:
 
         assert "test_engine" in data
         assert data["test_engine"]["requests"] == 1
+        assert not os.path.exists(metrics_file + ".tmp")
+
+    def test_flush_without_writer(self):
+        """Test flush returns immediately when nothing was ever queued."""
+        assert self.collector.flush(timeout=0) is True
+        assert self.collector._writer_thread is None
+
+    def test_close_writes_pending_and_stops_writer(self):
+        """Test close persists queued snapshots and stops the writer thread."""
+        self.collector.ocr_metrics["test_engine"] = OCRMetrics()
+        self.collector.ocr_metrics["test_engine"].add_request(success=True)
+
+        self.collector._save_metrics()
+        writer = self.collector._writer_thread
+
+        assert self.collector.close(timeout=5) is True
+        assert not writer.is_alive()
+        assert os.path.exists(os.path.join(self.temp_dir, "ocr_metrics.json"))
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork not available")
+    def test_save_in_forked_child(self):
+        """Test a forked child starts its own writer instead of waiting forever."""
+        self.collector._save_metrics()
+        self.collector.flush(timeout=5)
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                self.collector.ocr_metrics["child_engine"] = OCRMetrics()
+                self.collector._save_metrics()
+                ok = self.collector.flush(timeout=5) and self.collector.close(timeout=5)
+            finally:
+                os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+        with open(os.path.join(self.temp_dir, "ocr_metrics.json"), 'r') as f:
+            assert "child_engine" in json.load(f)
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork not available")
+    def test_fork_while_bucket_lock_held(self):
+        """Test a child does not inherit a bucket lock held by another parent thread."""
+        import threading
+        import time
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_bucket_lock():
+            buckets = self.collector._get_thread_buckets()
+            with buckets.lock:
+                locked.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_bucket_lock)
+        holder.start()
+        locked.wait()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                ok = False
+                try:
+                    self.collector.record_ocr_request("child_engine", success=True)
+                    ok = "child_engine" in self.collector.get_ocr_metrics()
+                    self.collector._save_metrics()
+                    ok = ok and self.collector.close(timeout=5)
+                finally:
+                    os._exit(0 if ok else 1)
+        finally:
+            release.set()
+            holder.join()
+
+        deadline = time.monotonic() + 10
+        while True:
+            waited_pid, status = os.waitpid(pid, os.WNOHANG)
+            if waited_pid:
+                break
+            if time.monotonic() > deadline:
+                os.kill(pid, 9)
+                os.waitpid(pid, 0)
+                pytest.fail("forked child deadlocked on an inherited bucket lock")
+            time.sleep(0.05)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
 
     def test_record_ocr_request(self):
         """Test recording OCR request metrics."""
@@ -211,11 +349,11 @@ class TestMetricsCollector:
             metrics = self.collector.ocr_metrics["pytesseract"]
             assert metrics.requests == 1
             assert metrics.successful_requests == 1
-            assert metrics.latencies_ms == [100.0]
-            assert metrics.pages_processed == [5]
-            assert metrics.words_extracted == [100]
-            assert metrics.costs == [0.50]
-            assert metrics.confidence_scores == [0.85]
+            assert list(metrics.latency_samples) == [100.0]
+            assert metrics.total_pages == 5
+            assert metrics.total_words == 100
+            assert metrics.total_cost == 0.50
+            assert metrics.avg_confidence == 0.85
 
             # Check that save was called (every 10 requests)
             mock_save.assert_not_called()  # Only 1 request, not called yet
@@ -236,6 +374,48 @@ class TestMetricsCollector:
             # Now save should be called
             mock_save.assert_called_once()
 
+    def test_record_ocr_request_from_threads(self):
+        """Test requests recorded on several threads are merged on read."""
+        import threading
+
+        def record():
+            for _ in range(25):
+                self.collector.record_ocr_request("pytesseract", success=True, latency_ms=10.0)
+
+        with patch.object(self.collector, '_save_metrics'):
+            threads = [threading.Thread(target=record) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            metrics = self.collector.ocr_metrics["pytesseract"]
+            assert metrics.requests == 100
+            assert metrics.latency_count == 100
+            assert metrics.avg_latency == 10.0
+
+    def test_exited_thread_buckets_are_released(self):
+        """Test buckets of finished threads are merged once and then dropped."""
+        import gc
+        import threading
+
+        def record():
+            for _ in range(5):
+                self.collector.record_ocr_request("pytesseract", success=True)
+
+        with patch.object(self.collector, '_save_metrics'):
+            threads = [threading.Thread(target=record) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            del threads, thread
+            gc.collect()
+
+            assert self.collector.ocr_metrics["pytesseract"].requests == 15
+            assert len(self.collector._thread_buckets) == 0
+            assert len(self.collector._retired_buckets) == 0
+
     def test_get_ocr_metrics_specific_engine(self):
         """Test getting metrics for specific engine."""
         self.collector.ocr_metrics["pytesseract"] = OCRMetrics()
@@ -317,6 +497,7 @@ class TestMetricsTimer:
 
     def teardown_method(self):
         """Clean up test environment."""
+        self.collector.close()
         # Remove test files
         if os.path.exists(os.path.join(self.temp_dir, "ocr_metrics.json")):
             os.remove(os.path.join(self.temp_dir, "ocr_metrics.json"))
@@ -339,12 +520,12 @@ class TestMetricsTimer:
         assert metrics.requests == 1
         assert metrics.successful_requests == 1
         assert metrics.failed_requests == 0
-        assert metrics.pages_processed == [5]
-        assert metrics.words_extracted == [100]
-        assert metrics.costs == [0.50]
-        assert metrics.confidence_scores == [0.85]
-        assert len(metrics.latencies_ms) == 1
-        assert metrics.latencies_ms[0] > 0  # Should have some latency
+        assert metrics.total_pages == 5
+        assert metrics.total_words == 100
+        assert metrics.total_cost == 0.50
+        assert metrics.avg_confidence == 0.85
+        assert metrics.latency_count == 1
+        assert metrics.avg_latency > 0  # Should have some latency
 
     def test_timer_failure(self):
         """Test timer with failed operation."""
@@ -359,8 +540,8 @@ class TestMetricsTimer:
         assert metrics.requests == 1
         assert metrics.successful_requests == 0
         assert metrics.failed_requests == 1
-        assert metrics.pages_processed == [5]  # Should still record pages even on failure
-        assert len(metrics.latencies_ms) == 1  # Should record latency even on failure
+        assert metrics.total_pages == 5  # Should still record pages even on failure
+        assert metrics.latency_count == 1  # Should record latency even on failure
 
 
 class TestMetricsFunctions:
@@ -393,11 +574,11 @@ class TestMetricsFunctions:
             metrics = collector.ocr_metrics["pytesseract"]
             assert metrics.requests == 1
             assert metrics.successful_requests == 1
-            assert metrics.latencies_ms == [100.0]
-            assert metrics.pages_processed == [5]
-            assert metrics.words_extracted == [100]
-            assert metrics.costs == [0.50]
-            assert metrics.confidence_scores == [0.85]
+            assert list(metrics.latency_samples) == [100.0]
+            assert metrics.total_pages == 5
+            assert metrics.total_words == 100
+            assert metrics.total_cost == 0.50
+            assert metrics.avg_confidence == 0.85
 
         # Cleanup
         if os.path.exists(os.path.join(temp_dir, "ocr_metrics.json")):
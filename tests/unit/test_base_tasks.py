@@ -0,0 +1,298 @@
+"""Unit tests for the Celery base task classes."""
+
+import socket
+import pytest
+import structlog
+from unittest.mock import call, patch
+
+from celery import Celery, Task
+
+from workers.base_tasks import BaseTask, BatchProcessingTask, DocumentProcessingTask
+
+
+class SampleTask(BaseTask):
+    """Concrete task for exercising BaseTask hooks."""
+
+    name = "tests.sample_task"
+
+    def run(self):
+        return None
+
+
+class SampleDocumentTask(DocumentProcessingTask):
+    """Concrete task for exercising DocumentProcessingTask hooks."""
+
+    name = "tests.sample_document_task"
+
+    def run(self):
+        return None
+
+
+class SampleBatchTask(BatchProcessingTask):
+    """Batch task that doubles items and fails chunks containing negatives."""
+
+    name = "tests.sample_batch_task"
+
+    def run(self):
+        return None
+
+    def process_batch_chunk(self, batch):
+        if any(item < 0 for item in batch):
+            raise ValueError("negative item")
+        return [item * 2 for item in batch]
+
+
+@pytest.fixture
+def celery_app():
+    """Celery app the sample tasks are bound to."""
+    return Celery("test_base_tasks")
+
+
+class TestBaseTaskFailureRouting:
+    """Test dead-letter routing in BaseTask.on_failure."""
+
+    def _fail(self, task, exc, retries=0):
+        """Run on_failure for exc at the given retry count, returning the DLQ mock."""
+        task.push_request(id="task-1", retries=retries)
+        try:
+            with patch.object(task, '_move_to_dead_letter_queue') as mock_dlq:
+                task.on_failure(exc, "task-1", (), {}, None)
+        finally:
+            task.pop_request()
+        return mock_dlq
+
+    @pytest.mark.parametrize("exc", [ValueError("bad"), TypeError("bad"), KeyError("bad")])
+    def test_non_retryable_error_goes_to_dead_letter_queue(self, celery_app, exc):
+        """Test deterministic errors are dead-lettered on the first attempt."""
+        mock_dlq = self._fail(celery_app.register_task(SampleTask()), exc)
+
+        mock_dlq.assert_called_once()
+        assert mock_dlq.call_args[0][1] is exc
+
+    @pytest.mark.parametrize("exc", [
+        ConnectionError("refused"),
+        TimeoutError("timed out"),
+        socket.gaierror("name resolution failed"),
+    ])
+    def test_retryable_error_skips_dead_letter_queue_until_exhausted(self, celery_app, exc):
+        """Test transient errors are only dead-lettered once retries run out."""
+        task = celery_app.register_task(SampleTask())
+
+        self._fail(task, exc, retries=0).assert_not_called()
+        self._fail(task, exc, retries=task._max_retries).assert_called_once()
+
+    @pytest.mark.parametrize("exc", [
+        FileNotFoundError("gone"),
+        PermissionError("denied"),
+        IsADirectoryError("is a directory"),
+        NotADirectoryError("not a directory"),
+    ])
+    def test_deterministic_os_error_goes_to_dead_letter_queue(self, celery_app, exc):
+        """Test OSErrors that fail identically on retry are dead-lettered immediately."""
+        task = celery_app.register_task(SampleTask())
+        mock_dlq = self._fail(task, exc)
+
+        mock_dlq.assert_called_once()
+        assert mock_dlq.call_args[0][1] is exc
+
+    def test_retry_limit_read_at_use(self, celery_app):
+        """Test a retry_kwargs override after class creation sets the dead-letter limit."""
+        task = celery_app.register_task(SampleTask())
+
+        with patch.object(task, 'retry_kwargs', {'max_retries': 1}):
+            self._fail(task, ConnectionError("refused"), retries=1).assert_called_once()
+
+        with patch.object(task, 'retry_kwargs', {}):
+            task.max_retries = 5
+            self._fail(task, ConnectionError("refused"), retries=3).assert_not_called()
+            self._fail(task, ConnectionError("refused"), retries=5).assert_called_once()
+
+    def test_document_task_retries_permission_error(self, celery_app):
+        """Test document tasks keep retrying PermissionError on locked files."""
+        task = celery_app.register_task(SampleDocumentTask())
+
+        self._fail(task, PermissionError("locked")).assert_not_called()
+
+    def test_document_task_dead_letters_missing_file(self, celery_app):
+        """Test FileNotFoundError is dead-lettered although it is an OSError."""
+        task = celery_app.register_task(SampleDocumentTask())
+        mock_dlq = self._fail(task, FileNotFoundError("gone"))
+
+        mock_dlq.assert_called_once()
+
+
+class TestBaseTaskLogging:
+    """Test BaseTask hooks with structlog's default, non-stdlib wrapper."""
+
+    def test_on_success_logs_without_is_enabled_for(self, celery_app):
+        """Test hooks log instead of failing when the logger lacks isEnabledFor."""
+        task = celery_app.register_task(SampleTask())
+        saved_config = structlog.get_config()
+        structlog.reset_defaults()
+        try:
+            with patch.object(task, 'task_logger', structlog.get_logger("test")):
+                with structlog.testing.capture_logs() as captured:
+                    task.on_success(None, "task-1", (), {})
+        finally:
+            structlog.configure(**saved_config)
+
+        assert [entry["event"] for entry in captured] == ["Task completed successfully"]
+
+
+class TestBaseTaskTiming:
+    """Test execution time is tracked per invocation."""
+
+    def test_each_request_measures_its_own_duration(self, celery_app):
+        """Test overlapping calls keep their start times on their own request contexts."""
+        task = celery_app.register_task(SampleTask())
+
+        with patch('workers.base_tasks.time') as mock_time:
+            mock_time.perf_counter.side_effect = [10.0, 20.0, 25.0, 25.0]
+
+            task.push_request(id="first")
+            task()
+            task.push_request(id="second")
+            task()
+
+            assert task._execution_time() == 5.0
+            task.pop_request()
+            assert task._execution_time() == 15.0
+            task.pop_request()
+
+        assert '_base_start_perf' not in vars(task)
+
+    def test_execution_time_without_start(self, celery_app):
+        """Test hooks report zero when the call was never started through __call__."""
+        task = celery_app.register_task(SampleTask())
+
+        task.push_request(id="never-called")
+        try:
+            assert task._execution_time() == 0
+        finally:
+            task.pop_request()
+
+
+class TestBatchProcessing:
+    """Test chunked processing in BatchProcessingTask."""
+
+    @pytest.fixture
+    def batch_task(self, celery_app):
+        """Batch task with progress updates and logging stubbed out."""
+        task = celery_app.register_task(SampleBatchTask())
+        with patch.object(task, 'update_progress'), patch.object(task, 'task_logger'):
+            yield task
+
+    def test_iter_process_batch_yields_chunks_with_results(self, batch_task):
+        """Test each chunk is yielded with its results, or None when it failed."""
+        chunks = list(batch_task.iter_process_batch([1, 2, -3, 4, 5], batch_size=2))
+
+        assert chunks == [
+            ([1, 2], [2, 4]),
+            ([-3, 4], None),
+            ([5], [10]),
+        ]
+        batch_task.task_logger.error.assert_called_once()
+        assert batch_task.task_logger.error.call_args[1]['batch_start'] == 3
+
+    def test_iter_process_batch_is_lazy(self, batch_task):
+        """Test chunks are processed only as the caller consumes them."""
+        with patch.object(batch_task, 'process_batch_chunk', wraps=batch_task.process_batch_chunk) as mock_chunk:
+            chunks = batch_task.iter_process_batch([1, 2, 3, 4], batch_size=2)
+            assert mock_chunk.call_count == 0
+
+            next(chunks)
+            assert mock_chunk.call_count == 1
+
+    def test_process_batch_totals(self, batch_task):
+        """Test process_batch aggregates the streamed chunks like before."""
+        result = batch_task.process_batch([1, 2, -3, 4, 5], batch_size=2)
+
+        assert result == {
+            'processed': 3,
+            'failed': 2,
+            'total': 5,
+            'results': [2, 4, 10],
+        }
+
+    def test_process_batch_default_chunk_size(self, batch_task):
+        """Test chunk_size is used when no batch size is given."""
+        batch_task.chunk_size = 3
+
+        chunks = [batch for batch, _ in batch_task.iter_process_batch([1, 2, 3, 4])]
+
+        assert chunks == [[1, 2, 3], [4]]
+        assert batch_task.process_batch([1, 2, 3, 4])['results'] == [2, 4, 6, 8]
+
+    def test_progress_reports_items_handled(self, batch_task):
+        """Test progress carries the cumulative batch_end after each chunk."""
+        batch_task.progress_update_interval = 0
+
+        batch_task.process_batch([1, 2, 3, 4, 5], batch_size=2)
+
+        assert batch_task.update_progress.call_args_list == [
+            call(2, 5, "Processed batch 1-2 of 5"),
+            call(4, 5, "Processed batch 3-4 of 5"),
+            call(5, 5, "Processed batch 5-5 of 5"),
+        ]
+
+    def test_progress_throttled_by_interval(self, batch_task):
+        """Test chunks inside the update interval skip the backend round-trip."""
+        batch_task.progress_update_interval = 3600
+
+        batch_task.process_batch(list(range(10)), batch_size=2)
+
+        assert batch_task.update_progress.call_args_list == [
+            call(10, 10, "Processed batch 9-10 of 10"),
+        ]
+
+    def test_progress_reported_when_interval_elapses(self, batch_task):
+        """Test a chunk finishing after the interval reports progress."""
+        batch_task.progress_update_interval = 1.0
+
+        with patch('workers.base_tasks.time') as mock_time:
+            # Start, then one monotonic reading per chunk
+            mock_time.monotonic.side_effect = [0.0, 0.5, 1.5, 1.6]
+            batch_task.process_batch([1, 2, 3], batch_size=1)
+
+        assert batch_task.update_progress.call_args_list == [
+            call(2, 3, "Processed batch 2-2 of 3"),
+            call(3, 3, "Processed batch 3-3 of 3"),
+        ]
+
+    def test_progress_reported_for_failed_final_chunk(self, batch_task):
+        """Test the final chunk always reports progress, even when it failed."""
+        batch_task.progress_update_interval = 3600
+
+        result = batch_task.process_batch([1, 2, -3], batch_size=2)
+
+        assert result['failed'] == 1
+        assert batch_task.update_progress.call_args_list == [
+            call(3, 3, "Processed batch 3-3 of 3"),
+        ]
+
+    def test_process_batch_empty(self, batch_task):
+        """Test an empty item list short-circuits."""
+        assert batch_task.process_batch([]) == {'processed': 0, 'failed': 0, 'results': []}
+
+
+class TestBaseTaskRetry:
+    """Test BaseTask.retry honours dont_autoretry_for."""
+
+    def test_retry_refuses_excluded_error(self):
+        """Test excluded errors are re-raised instead of retried."""
+        exc = FileNotFoundError("gone")
+
+        with patch.object(Task, 'retry') as mock_retry:
+            with pytest.raises(FileNotFoundError):
+                SampleDocumentTask().retry(exc=exc)
+
+        mock_retry.assert_not_called()
+
+    def test_retry_delegates_other_errors(self):
+        """Test other errors are handed to Celery's retry."""
+        exc = PermissionError("locked")
+
+        with patch.object(Task, 'retry', return_value="retried") as mock_retry:
+            assert SampleDocumentTask().retry(exc=exc, countdown=5) == "retried"
+
+        mock_retry.assert_called_once_with(args=None, kwargs=None, exc=exc, countdown=5)
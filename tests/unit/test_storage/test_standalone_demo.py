@@ -8,6 +8,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+# Expected digests are computed once at import rather than inside each test.
+_EMPTY_SHA = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+_TEST_DATA = b"Test data for hashing"
+_TEST_SHA = hashlib.sha256(_TEST_DATA).hexdigest()
+
 
 class TestStorageConfigurationDemo:
     """Demo tests for storage configuration."""
@@ -51,13 +56,10 @@ class TestHashingDemo:
 
     def test_sha256_consistency(self):
         """Test that SHA256 produces consistent results."""
-        test_data = b"Test data for hashing"
-        expected_hash = hashlib.sha256(test_data).hexdigest()
-
         # Multiple calls should produce same hash
         for _ in range(5):
-            actual_hash = hashlib.sha256(test_data).hexdigest()
-            assert actual_hash == expected_hash
+            actual_hash = hashlib.sha256(_TEST_DATA).hexdigest()
+            assert actual_hash == _TEST_SHA
             assert len(actual_hash) == 64  # SHA256 hex length
 
     def test_different_data_different_hashes(self):
@@ -73,7 +75,7 @@ class TestHashingDemo:
     def test_empty_data_hash(self):
         """Test hashing empty data."""
         empty_hash = hashlib.sha256(b"").hexdigest()
-        assert empty_hash is not None
+        assert empty_hash == _EMPTY_SHA
         assert len(empty_hash) == 64
 
 
@@ -1,18 +1,56 @@
 """Tests for AWS Textract OCR service."""
 
+import os
+import asyncio
 import pytest
 import json
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock, patch
 from botocore.exceptions import ClientError, NoCredentialsError
+from textractor.data.constants import TextractFeatures
 
-from services.ocr.textract_service import TextractOCRService, create_textract_service
-from services.ocr.interface import OCRError, OCRConfigurationError, OCRProcessingError
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+    ImageDraw = None
+
+from services.ocr.textract_service import (
+    TextractOCRService, create_textract_service, _get_session, _get_textractor
+)
+from services.ocr.interface import OCRError, OCRConfigurationError, OCRProcessingError, OCRThrottledError
+
+
+@pytest.fixture(scope="module")
+def textract_service():
+    """Textract service shared across tests that don't depend on construction."""
+    blob_storage = Mock()
+    blob_storage.store.return_value = "stored_key_12345"
+    with patch('boto3.Session') as mock_session:
+        mock_session.return_value.get_credentials.return_value = Mock()
+        service = TextractOCRService(blob_storage=blob_storage)
+    _get_session.cache_clear()
+    return service
 
 
 class TestTextractOCRService:
     """Test cases for TextractOCRService."""
 
+    @pytest.fixture(autouse=True)
+    def clear_session_cache(self):
+        """Drop cached AWS clients so each test sees its own patched classes."""
+        _get_session.cache_clear()
+        _get_textractor.cache_clear()
+        yield
+        _get_session.cache_clear()
+        _get_textractor.cache_clear()
+
+    @pytest.fixture(autouse=True)
+    def reset_shared_service(self, textract_service):
+        """Clear call history recorded on the shared service's blob storage."""
+        textract_service.blob_storage.reset_mock()
+
     @pytest.fixture
     def mock_blob_storage(self):
         """Mock blob storage service."""
@@ -34,36 +72,36 @@ class TestTextractOCRService:
         mock_doc.text = "Sample extracted text"
         mock_doc.response = {"DocumentMetadata": {"Pages": 1}}
         
-        # Mock tables
-        mock_table = Mock()
-        mock_table.rows = [Mock(), Mock()]
-        mock_table.rows[0].cells = [Mock(), Mock()]
-        mock_table.rows[0].cells[0].text = "Cell 1,1"
-        mock_table.rows[0].cells[0].confidence = 0.95
-        mock_table.rows[0].cells[1].text = "Cell 1,2"
-        mock_table.rows[0].cells[1].confidence = 0.93
-        mock_table.rows[1].cells = [Mock(), Mock()]
-        mock_table.rows[1].cells[0].text = "Cell 2,1"
-        mock_table.rows[1].cells[0].confidence = 0.89
-        mock_table.rows[1].cells[1].text = "Cell 2,2"
-        mock_table.rows[1].cells[1].confidence = 0.91
-        mock_table.get_text.return_value = "| Cell 1,1 | Cell 1,2 |\n| Cell 2,1 | Cell 2,2 |"
+        # Mock tables (plain attribute holders; only the document needs Mock)
+        mock_table = SimpleNamespace(
+            rows=[
+                SimpleNamespace(cells=[
+                    SimpleNamespace(text="Cell 1,1", confidence=0.95),
+                    SimpleNamespace(text="Cell 1,2", confidence=0.93)
+                ]),
+                SimpleNamespace(cells=[
+                    SimpleNamespace(text="Cell 2,1", confidence=0.89),
+                    SimpleNamespace(text="Cell 2,2", confidence=0.91)
+                ])
+            ],
+            get_text=lambda: "| Cell 1,1 | Cell 1,2 |\n| Cell 2,1 | Cell 2,2 |"
+        )
         mock_doc.tables = [mock_table]
         
         # Mock key-value pairs
-        mock_kv = Mock()
-        mock_kv.key.text = "Name"
-        mock_kv.value.text = "John Doe"
-        mock_kv.key.confidence = 0.98
-        mock_kv.value.confidence = 0.96
+        mock_kv = SimpleNamespace(
+            key=SimpleNamespace(text="Name", confidence=0.98),
+            value=SimpleNamespace(text="John Doe", confidence=0.96)
+        )
         mock_doc.key_values = [mock_kv]
         
         # Mock pages
-        mock_page = Mock()
-        mock_page.width = 612
-        mock_page.height = 792
-        mock_page.words = ["word1", "word2", "word3"]
-        mock_page.lines = ["line1", "line2"]
+        mock_page = SimpleNamespace(
+            width=612,
+            height=792,
+            words=["word1", "word2", "word3"],
+            lines=["line1", "line2"]
+        )
         mock_doc.pages = [mock_page]
         
         return mock_doc
@@ -75,7 +113,8 @@ class TestTextractOCRService:
             
             service = TextractOCRService(blob_storage=mock_blob_storage)
             assert service.blob_storage == mock_blob_storage
-            assert service.SUPPORTED_FORMATS == {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.tif'}
+            assert service.SUPPORTED_FORMATS == frozenset({'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.tif'})
+            assert isinstance(service.SUPPORTED_FORMATS, frozenset)
 
     def test_initialization_no_credentials(self, mock_blob_storage):
         """Test initialization failure with no AWS credentials."""
@@ -110,190 +149,214 @@ class TestTextractOCRService:
                 # Should not call constructor again
                 assert mock_textractor_class.call_count == 1
 
-    def test_convert_features(self, mock_blob_storage):
-        """Test feature string to enum conversion."""
-        with patch('boto3.Session') as mock_session:
+    def test_textractor_not_shared_with_session_token(self, mock_blob_storage):
+        """Test temporary credentials get a per-instance Textractor."""
+        with patch('boto3.Session') as mock_session, \
+                patch('services.ocr.textract_service.settings') as mock_settings, \
+                patch('services.ocr.textract_service.Textractor') as mock_textractor_class:
             mock_session.return_value.get_credentials.return_value = Mock()
+            mock_settings.AWS_SESSION_TOKEN = "temporary-token"
+            mock_settings.AWS_REGION = "us-east-1"
+            mock_textractor_class.side_effect = lambda **kwargs: Mock()
             
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            # Test with known features
-            features = service._convert_features(['tables', 'forms', 'layout'])
-            from textractor.data.constants import TextractFeatures
-            assert TextractFeatures.TABLES in features
-            assert TextractFeatures.FORMS in features
-            assert TextractFeatures.LAYOUT in features
-            
-            # Test with unknown feature (should log warning)
-            features = service._convert_features(['unknown_feature'])
-            # Should fall back to default
-            assert TextractFeatures.TABLES in features
-            assert TextractFeatures.FORMS in features
+            first = TextractOCRService(blob_storage=mock_blob_storage).textractor
+            second = TextractOCRService(blob_storage=mock_blob_storage).textractor
             
-            # Test with empty list (should use defaults)
-            features = service._convert_features([])
-            assert TextractFeatures.TABLES in features
-            assert TextractFeatures.FORMS in features
+            assert first is not second
+            assert mock_textractor_class.call_count == 2
+            assert _get_textractor.cache_info().currsize == 0
 
-    def test_analyze_document_sync_success(self, mock_blob_storage, mock_document_path, mock_textract_document):
+    def test_convert_features(self, textract_service):
+        """Test feature string to enum conversion."""
+        service = textract_service
+        
+        # Test with known features
+        features = service._convert_features(['tables', 'forms', 'layout'])
+        assert TextractFeatures.TABLES in features
+        assert TextractFeatures.FORMS in features
+        assert TextractFeatures.LAYOUT in features
+        
+        # Test with unknown feature (should log warning)
+        features = service._convert_features(['unknown_feature'])
+        # Should fall back to default
+        assert TextractFeatures.TABLES in features
+        assert TextractFeatures.FORMS in features
+        
+        # Test with empty list (should use defaults)
+        features = service._convert_features([])
+        assert TextractFeatures.TABLES in features
+        assert TextractFeatures.FORMS in features
+
+    def test_analyze_document_sync_success(self, textract_service, mock_document_path, mock_textract_document):
         """Test successful synchronous document analysis."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            with patch.object(service, '_textractor') as mock_textractor:
-                mock_textractor.analyze_document.return_value = mock_textract_document
-                
-                result = service.analyze_document(mock_document_path, ['tables', 'forms'])
-                
-                # Verify textract was called correctly
-                mock_textractor.analyze_document.assert_called_once()
-                call_args = mock_textractor.analyze_document.call_args
-                assert str(mock_document_path) in call_args[1]['file_source']
-                
-                # Verify result structure
-                assert result['text'] == "Sample extracted text"
-                assert len(result['tables']) == 1
-                assert result['tables'][0]['row_count'] == 2
-                assert result['tables'][0]['column_count'] == 2
-                assert len(result['key_value_pairs']) == 1
-                assert result['key_value_pairs'][0]['key'] == "Name"
-                assert result['key_value_pairs'][0]['value'] == "John Doe"
-                assert len(result['pages']) == 1
-                assert result['pages'][0]['page_number'] == 1
-                assert 'raw_response_key' in result
-
-    def test_analyze_document_async_success(self, mock_blob_storage, mock_document_path, mock_textract_document):
+        service = textract_service
+        
+        with patch.object(service, '_textractor') as mock_textractor:
+            mock_textractor.analyze_document.return_value = mock_textract_document
+            
+            result = service.analyze_document(mock_document_path, ['tables', 'forms'])
+            
+            # Verify textract was called correctly
+            mock_textractor.analyze_document.assert_called_once()
+            call_args = mock_textractor.analyze_document.call_args
+            assert str(mock_document_path) in call_args[1]['file_source']
+            
+            # Verify result structure
+            assert result['text'] == "Sample extracted text"
+            assert len(result['tables']) == 1
+            assert result['tables'][0]['row_count'] == 2
+            assert result['tables'][0]['column_count'] == 2
+            assert len(result['key_value_pairs']) == 1
+            assert result['key_value_pairs'][0]['key'] == "Name"
+            assert result['key_value_pairs'][0]['value'] == "John Doe"
+            assert len(result['pages']) == 1
+            assert result['pages'][0]['page_number'] == 1
+            assert 'raw_response_key' in result
+
+    def test_analyze_document_async_success(self, textract_service, mock_document_path, mock_textract_document):
         """Test successful asynchronous document analysis."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            # Create a large file to trigger async processing
-            large_content = b"x" * (6 * 1024 * 1024)  # 6MB
-            mock_document_path.write_bytes(large_content)
+        service = textract_service
+        
+        with patch('services.ocr.textract_service.settings') as mock_settings:
+            mock_settings.TEXTRACT_S3_BUCKET = "test-bucket"
+            mock_settings.TEXTRACT_S3_PREFIX = "textract/"
             
-            with patch('services.ocr.textract_service.settings') as mock_settings:
-                mock_settings.TEXTRACT_S3_BUCKET = "test-bucket"
-                mock_settings.TEXTRACT_S3_PREFIX = "textract/"
+            with patch.object(service, '_textractor') as mock_textractor:
+                mock_textractor.start_document_analysis.return_value = mock_textract_document
                 
-                service = TextractOCRService(blob_storage=mock_blob_storage)
+                # A 6MB size hint triggers async processing without a large file
+                result = service.analyze_document(
+                    mock_document_path, ['tables'], size_bytes=6 * 1024 * 1024
+                )
                 
-                with patch.object(service, '_textractor') as mock_textractor:
-                    mock_textractor.start_document_analysis.return_value = mock_textract_document
-                    
-                    result = service.analyze_document(mock_document_path, ['tables'])
-                    
-                    # Verify async method was called
-                    mock_textractor.start_document_analysis.assert_called_once()
-                    call_args = mock_textractor.start_document_analysis.call_args
-                    assert call_args[1]['s3_upload_path'] == "s3://test-bucket/textract/"
-
-    def test_analyze_document_unsupported_format(self, mock_blob_storage, tmp_path):
+                # Verify async method was called
+                mock_textractor.start_document_analysis.assert_called_once()
+                call_args = mock_textractor.start_document_analysis.call_args
+                assert call_args[1]['s3_upload_path'] == "s3://test-bucket/textract/"
+
+    def test_analyze_documents_concurrent(self, textract_service, tmp_path, mock_textract_document):
+        """Test batch analysis dispatches every document."""
+        service = textract_service
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"doc_{i}.pdf"
+            path.write_bytes(b"Mock PDF content")
+            paths.append(path)
+        
+        with patch.object(service, '_textractor') as mock_textractor:
+            mock_textractor.analyze_document.return_value = mock_textract_document
+            
+            results = asyncio.run(
+                service.analyze_documents(paths, ['tables'], max_concurrency=2, rps=1000)
+            )
+            
+            assert len(results) == 3
+            assert all(result['text'] == "Sample extracted text" for result in results)
+            assert mock_textractor.analyze_document.call_count == 3
+            called_paths = {call[1]['file_source'] for call in mock_textractor.analyze_document.call_args_list}
+            assert called_paths == {str(path) for path in paths}
+
+    def test_analyze_document_unsupported_format(self, textract_service, tmp_path):
         """Test analysis with unsupported file format."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            unsupported_file = tmp_path / "test.txt"
-            unsupported_file.write_text("Some text")
-            
-            with pytest.raises(OCRProcessingError) as exc_info:
-                service.analyze_document(unsupported_file)
-            
-            assert "Unsupported file format" in str(exc_info.value)
-            assert exc_info.value.service_name == "textract"
+        service = textract_service
+        
+        unsupported_file = tmp_path / "test.txt"
+        unsupported_file.write_text("Some text")
+        
+        with pytest.raises(OCRProcessingError) as exc_info:
+            service.analyze_document(unsupported_file)
+        
+        assert "Unsupported file format" in str(exc_info.value)
+        assert exc_info.value.service_name == "textract"
 
-    def test_analyze_document_async_no_bucket(self, mock_blob_storage, mock_document_path):
+    def test_analyze_document_async_no_bucket(self, textract_service, mock_document_path):
         """Test async processing failure when no S3 bucket configured."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
+        service = textract_service
+        
+        # Grow the file to 6MB sparsely to trigger async processing
+        os.truncate(mock_document_path, 6 * 1024 * 1024)
+        
+        with patch('services.ocr.textract_service.settings') as mock_settings:
+            mock_settings.TEXTRACT_S3_BUCKET = None
             
-            # Create a large file to trigger async processing
-            large_content = b"x" * (6 * 1024 * 1024)  # 6MB
-            mock_document_path.write_bytes(large_content)
+            with pytest.raises(OCRConfigurationError) as exc_info:
+                service.analyze_document(mock_document_path)
             
-            with patch('services.ocr.textract_service.settings') as mock_settings:
-                mock_settings.TEXTRACT_S3_BUCKET = None
-                
-                service = TextractOCRService(blob_storage=mock_blob_storage)
-                
-                with pytest.raises(OCRConfigurationError) as exc_info:
-                    service.analyze_document(mock_document_path)
-                
-                assert "TEXTRACT_S3_BUCKET must be configured" in str(exc_info.value)
+            assert "TEXTRACT_S3_BUCKET must be configured" in str(exc_info.value)
 
-    def test_analyze_document_client_error(self, mock_blob_storage, mock_document_path):
+    def test_analyze_document_client_error(self, textract_service, mock_document_path):
         """Test handling of AWS client errors."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            with patch.object(service, '_textractor') as mock_textractor:
-                mock_textractor.analyze_document.side_effect = ClientError(
-                    error_response={'Error': {'Code': 'InvalidParameterException', 'Message': 'Invalid input'}},
-                    operation_name='AnalyzeDocument'
-                )
-                
-                with pytest.raises(OCRProcessingError) as exc_info:
-                    service.analyze_document(mock_document_path)
-                
-                assert "Textract processing failed" in str(exc_info.value)
-
-    def test_extract_text(self, mock_blob_storage):
-        """Test text extraction from analysis result."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
+        service = textract_service
+        
+        with patch.object(service, '_textractor') as mock_textractor:
+            mock_textractor.analyze_document.side_effect = ClientError(
+                error_response={'Error': {'Code': 'InvalidParameterException', 'Message': 'Invalid input'}},
+                operation_name='AnalyzeDocument'
+            )
             
-            service = TextractOCRService(blob_storage=mock_blob_storage)
+            with pytest.raises(OCRProcessingError) as exc_info:
+                service.analyze_document(mock_document_path)
             
-            analysis_result = {'text': 'Extracted text content'}
-            text = service.extract_text(analysis_result)
-            assert text == 'Extracted text content'
+            assert "Textract processing failed" in str(exc_info.value)
 
-    def test_extract_tables(self, mock_blob_storage):
-        """Test table extraction from analysis result."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
+    def test_analyze_document_throttling_retry(self, textract_service, mock_document_path, mock_textract_document):
+        """Test throttled Textract calls are retried with backoff."""
+        service = textract_service
+        throttled = ClientError(
+            error_response={'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+            operation_name='AnalyzeDocument'
+        )
+        
+        with patch.object(service, '_textractor') as mock_textractor, \
+                patch('services.ocr.textract_service.time.sleep') as mock_sleep:
+            mock_textractor.analyze_document.side_effect = [throttled, mock_textract_document]
             
-            service = TextractOCRService(blob_storage=mock_blob_storage)
+            result = service.analyze_document(mock_document_path)
             
-            analysis_result = {
-                'tables': [
-                    {'table_id': 0, 'row_count': 2, 'column_count': 3, 'cells': []}
-                ]
-            }
-            tables = service.extract_tables(analysis_result)
-            assert len(tables) == 1
-            assert tables[0]['table_id'] == 0
+            assert result['text'] == "Sample extracted text"
+            assert mock_textractor.analyze_document.call_count == 2
+            mock_sleep.assert_called_once()
+            assert 5 <= mock_sleep.call_args[0][0] <= 10
 
-    def test_extract_key_value_pairs(self, mock_blob_storage):
-        """Test key-value pair extraction from analysis result."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
+    def test_analyze_document_throttling_exhausted(self, textract_service, mock_document_path):
+        """Test persistent throttling surfaces as OCRThrottledError."""
+        service = textract_service
+        
+        with patch.object(service, '_textractor') as mock_textractor, \
+                patch('services.ocr.textract_service.time.sleep') as mock_sleep:
+            mock_textractor.analyze_document.side_effect = ClientError(
+                error_response={'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Slow down'}},
+                operation_name='AnalyzeDocument'
+            )
             
-            service = TextractOCRService(blob_storage=mock_blob_storage)
+            with pytest.raises(OCRThrottledError) as exc_info:
+                service.analyze_document(mock_document_path)
             
-            analysis_result = {
-                'key_value_pairs': [
-                    {'key': 'Name', 'value': 'John Doe', 'key_confidence': 0.98, 'value_confidence': 0.96}
-                ]
-            }
-            kvs = service.extract_key_value_pairs(analysis_result)
-            assert len(kvs) == 1
-            assert kvs[0]['key'] == 'Name'
-            assert kvs[0]['value'] == 'John Doe'
+            assert exc_info.value.service_name == "textract"
+            assert mock_textractor.analyze_document.call_count == service.THROTTLE_MAX_ATTEMPTS
+            assert mock_sleep.call_count == service.THROTTLE_MAX_ATTEMPTS - 1
 
-    def test_calculate_metrics(self, mock_blob_storage):
-        """Test metrics calculation from analysis result."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            analysis_result = {
+    @pytest.mark.parametrize("method,args,expected", [
+        (
+            'extract_text',
+            ({'text': 'Extracted text content'},),
+            'Extracted text content'
+        ),
+        (
+            'extract_tables',
+            ({'tables': [{'table_id': 0, 'row_count': 2, 'column_count': 3, 'cells': []}]},),
+            [{'table_id': 0, 'row_count': 2, 'column_count': 3, 'cells': []}]
+        ),
+        (
+            'extract_key_value_pairs',
+            ({'key_value_pairs': [
+                {'key': 'Name', 'value': 'John Doe', 'key_confidence': 0.98, 'value_confidence': 0.96}
+            ]},),
+            [{'key': 'Name', 'value': 'John Doe', 'key_confidence': 0.98, 'value_confidence': 0.96}]
+        ),
+        (
+            'calculate_metrics',
+            ({
                 'pages': [
                     {'page_number': 1, 'word_count': 150, 'line_count': 20},
                     {'page_number': 2, 'word_count': 200, 'line_count': 25}
@@ -303,27 +366,25 @@ class TestTextractOCRService:
                     {'key': 'Name', 'value': 'John', 'key_confidence': 0.95, 'value_confidence': 0.90},
                     {'key': 'Age', 'value': '30', 'key_confidence': 0.98, 'value_confidence': 0.92}
                 ]
+            },),
+            {
+                'page_count': 2,
+                'word_count': 350,
+                'line_count': 45,
+                'table_count': 2,
+                'key_value_pair_count': 2,
+                'average_confidence': pytest.approx(0.9375, rel=1e-3)
             }
-            
-            metrics = service.calculate_metrics(analysis_result)
-            
-            assert metrics['page_count'] == 2
-            assert metrics['word_count'] == 350
-            assert metrics['line_count'] == 45
-            assert metrics['table_count'] == 2
-            assert metrics['key_value_pair_count'] == 2
-            assert metrics['average_confidence'] == pytest.approx(0.9375, rel=1e-3)
-
-    def test_get_supported_features(self, mock_blob_storage):
-        """Test getting supported features."""
-        with patch('boto3.Session') as mock_session:
-            mock_session.return_value.get_credentials.return_value = Mock()
-            
-            service = TextractOCRService(blob_storage=mock_blob_storage)
-            
-            features = service.get_supported_features()
-            expected_features = ['tables', 'forms', 'layout', 'queries', 'signatures']
-            assert all(feature in features for feature in expected_features)
+        ),
+        (
+            'get_supported_features',
+            (),
+            ['tables', 'forms', 'layout', 'queries', 'signatures']
+        ),
+    ])
+    def test_result_accessors(self, textract_service, method, args, expected):
+        """Test pure accessors and metrics over analysis results."""
+        assert getattr(textract_service, method)(*args) == expected
 
     def test_store_raw_response_no_blob_storage(self, mock_document_path, mock_textract_document):
         """Test document analysis without blob storage."""
@@ -366,14 +427,13 @@ class TestTextractServiceIntegration:
 
     @pytest.mark.integration 
     @pytest.mark.slow
+    @pytest.mark.skipif(Image is None, reason="PIL not installed")
     def test_real_document_processing(self, tmp_path):
         """Test processing a real document (requires AWS credentials and may incur costs)."""
         try:
             service = TextractOCRService()
             
             # Create a simple test image
-            from PIL import Image, ImageDraw, ImageFont
-            
             img = Image.new('RGB', (400, 200), color='white')
             draw = ImageDraw.Draw(img)
             draw.text((10, 10), "Test Document", fill='black')
@@ -6,13 +6,38 @@ from typing import Tuple, Optional
 import typer
 
 
-def parse_date_range(start_date: str, end_date: Optional[str] = None) -> Tuple[datetime, datetime]:
+# Thresholds used when validating backfill ranges
+_ONE_DAY = timedelta(days=1)
+_ONE_MONTH = timedelta(days=30)
+_ONE_YEAR = timedelta(days=365)
+_DAY_SECONDS = 86400.0
+
+# Relative dates such as "7 days ago" or "2 weeks ago"
+_RELATIVE_RE = re.compile(r'^(\d+)\s+(days?|weeks?|months?)\s+ago$')
+
+# Numeric date formats accepted by parse_date_string, matched in one pass:
+#   YYYY-MM-DD / YYYY/MM/DD, MM/DD/YYYY, DD-MM-YYYY, each with optional HH:MM[:SS]
+_DATE_RE = re.compile(
+    r'^(?:'
+    r'(?P<y1>\d{4})(?P<sep>[-/])(?P<m1>\d{1,2})(?P=sep)(?P<d1>\d{1,2})'
+    r'|(?P<m2>\d{1,2})/(?P<d2>\d{1,2})/(?P<y2>\d{4})'
+    r'|(?P<d3>\d{1,2})-(?P<m3>\d{1,2})-(?P<y3>\d{4})'
+    r')(?:\s+(?P<H>\d{1,2}):(?P<M>\d{1,2})(?::(?P<S>\d{1,2}))?)?$'
+)
+
+
+def parse_date_range(
+    start_date: str,
+    end_date: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
     """
     Parse start and end dates into datetime objects.
     
     Args:
         start_date: Start date string in various formats
         end_date: End date string (optional, defaults to now)
+        now: Reference time used as the default end (defaults to the current UTC time)
         
     Returns:
         Tuple of (start_datetime, end_datetime) with timezone info
@@ -28,7 +53,7 @@ def parse_date_range(start_date: str, end_date: Optional[str] = None) -> Tuple[d
         if end_date:
             end_dt = parse_date_string(end_date)
         else:
-            end_dt = datetime.now(timezone.utc)
+            end_dt = now if now is not None else datetime.now(timezone.utc)
             
         return start_dt, end_dt
         
@@ -59,7 +84,7 @@ def parse_date_string(date_str: str) -> datetime:
     date_str = date_str.strip()
     
     # Handle relative dates
-    relative_match = re.match(r'^(\d+)\s+(days?|weeks?|months?)\s+ago$', date_str.lower())
+    relative_match = _RELATIVE_RE.match(date_str.lower())
     if relative_match:
         amount = int(relative_match.group(1))
         unit = relative_match.group(2).rstrip('s')  # Remove plural 's'
@@ -73,32 +98,24 @@ def parse_date_string(date_str: str) -> datetime:
             # Approximate month as 30 days
             return now - timedelta(days=amount * 30)
     
-    # Common date formats to try
-    formats = [
-        '%Y-%m-%d %H:%M:%S',      # 2024-01-01 12:30:45
-        '%Y-%m-%d %H:%M',         # 2024-01-01 12:30
-        '%Y-%m-%d',               # 2024-01-01
-        '%Y/%m/%d %H:%M:%S',      # 2024/01/01 12:30:45
-        '%Y/%m/%d %H:%M',         # 2024/01/01 12:30
-        '%Y/%m/%d',               # 2024/01/01
-        '%m/%d/%Y %H:%M:%S',      # 01/01/2024 12:30:45
-        '%m/%d/%Y %H:%M',         # 01/01/2024 12:30
-        '%m/%d/%Y',               # 01/01/2024
-        '%d-%m-%Y %H:%M:%S',      # 01-01-2024 12:30:45
-        '%d-%m-%Y %H:%M',         # 01-01-2024 12:30
-        '%d-%m-%Y',               # 01-01-2024
-    ]
-    
-    # Try each format
-    for fmt in formats:
+    # Numeric formats: one regex match instead of trying strptime per format
+    match = _DATE_RE.match(date_str)
+    if match:
+        parts = match.groupdict()
+        if parts['y1']:
+            year, month, day = parts['y1'], parts['m1'], parts['d1']
+        elif parts['y2']:
+            year, month, day = parts['y2'], parts['m2'], parts['d2']
+        else:
+            year, month, day = parts['y3'], parts['m3'], parts['d3']
         try:
-            dt = datetime.strptime(date_str, fmt)
-            # Add timezone if not present
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
+            return datetime(
+                int(year), int(month), int(day),
+                int(parts['H'] or 0), int(parts['M'] or 0), int(parts['S'] or 0),
+                tzinfo=timezone.utc
+            )
         except ValueError:
-            continue
+            pass
     
     # Try ISO format with timezone
     try:
@@ -111,7 +128,12 @@ def parse_date_string(date_str: str) -> datetime:
                     "ISO format, or relative like '30 days ago'")
 
 
-def validate_date_range(start_dt: datetime, end_dt: datetime, max_messages: int = 1000) -> None:
+def validate_date_range(
+    start_dt: datetime,
+    end_dt: datetime,
+    max_messages: int = 1000,
+    now: Optional[datetime] = None
+) -> None:
     """
     Validate a date range for backfill operations.
     
@@ -119,6 +141,7 @@ def validate_date_range(start_dt: datetime, end_dt: datetime, max_messages: int
         start_dt: Start datetime
         end_dt: End datetime  
         max_messages: Maximum messages allowed for the range
+        now: Reference time (defaults to the current UTC time)
         
     Raises:
         ValueError: If validation fails
@@ -128,23 +151,24 @@ def validate_date_range(start_dt: datetime, end_dt: datetime, max_messages: int
         raise ValueError("Start date must be before end date")
     
     # Check that dates are not too far in the future
-    now = datetime.now(timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
     if start_dt > now:
         raise ValueError("Start date cannot be in the future")
-    if end_dt > now + timedelta(days=1):
+    if end_dt > now + _ONE_DAY:
         raise ValueError("End date cannot be more than 1 day in the future")
     
     # Check range is not too large (to prevent overwhelming the system)
     duration = end_dt - start_dt
     
     # Warn about large ranges
-    if duration > timedelta(days=365):
+    if duration > _ONE_YEAR:
         typer.echo(f"⚠️  Warning: Large date range ({duration.days} days)")
         if not typer.confirm("This may process a very large number of emails. Continue?"):
             raise ValueError("Operation cancelled by user")
     
     # Estimate potential messages and warn if needed
-    if duration > timedelta(days=30) and max_messages > 5000:
+    if duration > _ONE_MONTH and max_messages > 5000:
         typer.echo(f"⚠️  Warning: Large range ({duration.days} days) with high message limit ({max_messages})")
         if not typer.confirm("This may take a very long time. Continue?"):
             raise ValueError("Operation cancelled by user")
@@ -183,33 +207,37 @@ def get_gmail_date_query(start_dt: datetime, end_dt: datetime) -> str:
     Returns:
         Gmail query string for the date range
     """
-    start_date = start_dt.strftime('%Y/%m/%d')
-    end_date = end_dt.strftime('%Y/%m/%d')
+    start_date = f"{start_dt.year:04d}/{start_dt.month:02d}/{start_dt.day:02d}"
+    end_date = f"{end_dt.year:04d}/{end_dt.month:02d}/{end_dt.day:02d}"
     
     # Gmail query uses "after" and "before" operators
     return f"after:{start_date} before:{end_date}"
 
 
-def get_relative_date(days_ago: int) -> datetime:
+def get_relative_date(days_ago: int, now: Optional[datetime] = None) -> datetime:
     """
     Get a datetime object for a number of days ago.
     
     Args:
         days_ago: Number of days in the past
+        now: Reference time (defaults to the current UTC time)
         
     Returns:
         datetime object with timezone info
     """
-    return datetime.now(timezone.utc) - timedelta(days=days_ago)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return now - timedelta(days=days_ago)
 
 
-def is_recent_date(dt: datetime, max_age_days: int = 7) -> bool:
+def is_recent_date(dt: datetime, max_age_days: int = 7, now: Optional[datetime] = None) -> bool:
     """
     Check if a datetime is recent (within max_age_days).
     
     Args:
         dt: Datetime to check
         max_age_days: Maximum age in days to consider recent
+        now: Reference time (defaults to the current UTC time)
         
     Returns:
         True if the date is recent, False otherwise
@@ -217,27 +245,30 @@ def is_recent_date(dt: datetime, max_age_days: int = 7) -> bool:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     
-    age = datetime.now(timezone.utc) - dt
-    return age.total_seconds() <= max_age_days * 24 * 3600
+    if now is None:
+        now = datetime.now(timezone.utc)
+    age = now - dt
+    return age.total_seconds() <= max_age_days * _DAY_SECONDS
 
 
-# Common date constants
-COMMON_RANGES = {
-    'today': lambda: (get_relative_date(1), datetime.now(timezone.utc)),
-    'yesterday': lambda: (get_relative_date(2), get_relative_date(1)),
-    'last_week': lambda: (get_relative_date(7), datetime.now(timezone.utc)),
-    'last_month': lambda: (get_relative_date(30), datetime.now(timezone.utc)),
-    'last_3_months': lambda: (get_relative_date(90), datetime.now(timezone.utc)),
-    'last_year': lambda: (get_relative_date(365), datetime.now(timezone.utc)),
+# Common date ranges as (start, end) offsets back from the current time
+_RANGE_OFFSETS = {
+    'today': (timedelta(days=1), timedelta(0)),
+    'yesterday': (timedelta(days=2), timedelta(days=1)),
+    'last_week': (timedelta(days=7), timedelta(0)),
+    'last_month': (timedelta(days=30), timedelta(0)),
+    'last_3_months': (timedelta(days=90), timedelta(0)),
+    'last_year': (timedelta(days=365), timedelta(0)),
 }
 
 
-def get_common_range(range_name: str) -> Tuple[datetime, datetime]:
+def get_common_range(range_name: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
     """
     Get a common date range by name.
     
     Args:
         range_name: Name of the range ('today', 'last_week', etc.)
+        now: Reference time (defaults to the current UTC time)
         
     Returns:
         Tuple of (start_datetime, end_datetime)
@@ -245,8 +276,12 @@ def get_common_range(range_name: str) -> Tuple[datetime, datetime]:
     Raises:
         ValueError: If range name is not recognized
     """
-    if range_name not in COMMON_RANGES:
-        available = ', '.join(COMMON_RANGES.keys())
+    if range_name not in _RANGE_OFFSETS:
+        available = ', '.join(_RANGE_OFFSETS.keys())
         raise ValueError(f"Unknown range '{range_name}'. Available: {available}")
     
-    return COMMON_RANGES[range_name]()
+    # Read the clock once so both ends share the same reference point
+    if now is None:
+        now = datetime.now(timezone.utc)
+    start_offset, end_offset = _RANGE_OFFSETS[range_name]
+    return now - start_offset, now - end_offset
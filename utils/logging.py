@@ -4,9 +4,15 @@ import sys
 import logging
 import os
 import re
+import inspect
 from typing import Optional, Dict, Any, List
 from config import get_settings
 
+try:
+    import structlog
+except ImportError:
+    structlog = None
+
 
 class SensitiveDataRedactor:
     """Redactor for sensitive data in logs."""
@@ -25,10 +31,47 @@ class SensitiveDataRedactor:
         # Database connection strings
         (r'postgresql://[^:\s]+:[^@\s]+@', '[REDACTED_DB_URL]'),
         (r'mongodb://[^:\s]+:[^@\s]+@', '[REDACTED_DB_URL]'),
-        # Generic patterns for long alphanumeric strings that might be keys
-        (r'\b[A-Za-z0-9]{32,}\b', '[REDACTED_LONG_STRING]'),
+        # Generic patterns for long alphanumeric strings that might be keys.
+        # The lookahead/backreference pair behaves like a possessive
+        # [A-Za-z0-9]{32,}+ so a run followed by another word character fails
+        # without backtracking through every shorter length.
+        (r'\b(?=([A-Za-z0-9]{32,}))\1\b', '[REDACTED_LONG_STRING]'),
+    ]
+
+    # Lowercase literal each pattern needs in order to match (aligned with
+    # SENSITIVE_PATTERNS); None means the pattern always has to run
+    _PATTERN_TRIGGERS = [
+        'api_key',
+        'token',
+        'password',
+        'secret',
+        '@',
+        '://',
+        'postgresql://',
+        'mongodb://',
+        None,
     ]
 
+    # Patterns compiled once at import; redaction runs on every log event
+    _COMPILED_PATTERNS = [
+        (re.compile(pattern, re.IGNORECASE), replacement, trigger)
+        for (pattern, replacement), trigger in zip(SENSITIVE_PATTERNS, _PATTERN_TRIGGERS)
+    ]
+
+    # Metadata keys redact_dict passes through untouched (matched case-insensitively)
+    _SKIP_KEYS = frozenset(('timestamp', 'level', 'logger', 'request_id'))
+
+    # Exact-type lookup for redact_dict; subclasses fall back to isinstance
+    _VALUE_KINDS = {
+        str: 'str',
+        dict: 'dict',
+        list: 'list',
+        int: 'other',
+        float: 'other',
+        bool: 'other',
+        type(None): 'other',
+    }
+
     @classmethod
     def redact_sensitive_data(cls, message: str) -> str:
         """Redact sensitive data from log messages.
@@ -42,9 +85,22 @@ class SensitiveDataRedactor:
         if not isinstance(message, str):
             return str(message)
 
+        # Every pattern but the trailing long-string one needs '@', ':' or '='
+        if '@' not in message and ':' not in message and '=' not in message:
+            if len(message) < 32:
+                return message
+            long_string_pattern, replacement, _ = cls._COMPILED_PATTERNS[-1]
+            return long_string_pattern.sub(replacement, message)
+
+        # One lowercase copy decides which patterns can match at all. Non-ASCII
+        # text skips the check since IGNORECASE folds some non-ASCII characters
+        # onto ASCII letters.
+        lowered = message.lower() if message.isascii() else None
+
         redacted_message = message
-        for pattern, replacement in cls.SENSITIVE_PATTERNS:
-            redacted_message = re.sub(pattern, replacement, redacted_message, flags=re.IGNORECASE)
+        for pattern, replacement, trigger in cls._COMPILED_PATTERNS:
+            if trigger is None or lowered is None or trigger in lowered:
+                redacted_message = pattern.sub(replacement, redacted_message)
 
         return redacted_message
 
@@ -61,26 +117,65 @@ class SensitiveDataRedactor:
         if not isinstance(data, dict):
             return data
 
-        redacted_data = {}
-        for key, value in data.items():
-            # Skip redacting certain metadata keys
-            if key.lower() in ['timestamp', 'level', 'logger', 'request_id']:
-                redacted_data[key] = value
-                continue
-
-            if isinstance(value, str):
-                redacted_data[key] = cls.redact_sensitive_data(value)
-            elif isinstance(value, dict):
-                redacted_data[key] = cls.redact_dict(value)
-            elif isinstance(value, list):
-                redacted_data[key] = [cls.redact_dict(item) if isinstance(item, dict) else
-                                     cls.redact_sensitive_data(item) if isinstance(item, str) else item
-                                     for item in value]
-            else:
-                redacted_data[key] = value
+        redact_string = cls.redact_sensitive_data
+        value_kinds = cls._VALUE_KINDS
+        value_kind = cls._value_kind
+        skip_keys = cls._SKIP_KEYS
+
+        # Nested dicts are filled from an explicit worklist instead of recursing.
+        # Each source dict is copied once, keyed by id(), so shared and
+        # self-referencing dicts map onto the same redacted copy.
+        redacted_data: Dict[str, Any] = {}
+        copies = {id(data): redacted_data}
+        pending = [(data, redacted_data)]
+        while pending:
+            source, target = pending.pop()
+            for key, value in source.items():
+                # Skip redacting certain metadata keys
+                if key in skip_keys or key.lower() in skip_keys:
+                    target[key] = value
+                    continue
+
+                kind = value_kinds.get(type(value)) or value_kind(value)
+                if kind == 'str':
+                    target[key] = redact_string(value)
+                elif kind == 'dict':
+                    nested = copies.get(id(value))
+                    if nested is None:
+                        nested = copies[id(value)] = {}
+                        pending.append((value, nested))
+                    target[key] = nested
+                elif kind == 'list':
+                    items = []
+                    for item in value:
+                        item_kind = value_kinds.get(type(item)) or value_kind(item)
+                        if item_kind == 'str':
+                            items.append(redact_string(item))
+                        elif item_kind == 'dict':
+                            nested = copies.get(id(item))
+                            if nested is None:
+                                nested = copies[id(item)] = {}
+                                pending.append((item, nested))
+                            items.append(nested)
+                        else:
+                            items.append(item)
+                    target[key] = items
+                else:
+                    target[key] = value
 
         return redacted_data
 
+    @staticmethod
+    def _value_kind(value: Any) -> str:
+        """Classify values whose exact type is not in _VALUE_KINDS."""
+        if isinstance(value, str):
+            return 'str'
+        if isinstance(value, dict):
+            return 'dict'
+        if isinstance(value, list):
+            return 'list'
+        return 'other'
+
 
 def configure_logging(
     level: Optional[str] = None,
@@ -150,11 +245,12 @@ def configure_logging(
     )
 
     # Configure structlog if available
-    try:
-        import structlog
-
+    if structlog is not None:
         # Configure structlog processors based on format
         processors = [
+            # Drop events below the configured level before any
+            # enrichment or redaction work is done on them
+            structlog.stdlib.filter_by_level,
             structlog.contextvars.merge_contextvars,
             structlog.processors.add_log_level,
             structlog.processors.StackInfoRenderer(),
@@ -182,10 +278,6 @@ def configure_logging(
             cache_logger_on_first_use=True,
         )
 
-    except ImportError:
-        # structlog not available, continue with standard logging
-        pass
-
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """Get a logger instance.
@@ -196,19 +288,17 @@ def get_logger(name: Optional[str] = None) -> logging.Logger:
     Returns:
         Configured logger instance
     """
-    try:
-        import structlog
+    if structlog is not None:
         return structlog.get_logger(name)
-    except ImportError:
-        import inspect
-        if name is None:
-            # Get the calling module name
-            frame = inspect.currentframe()
-            try:
-                name = frame.f_back.f_globals.get("__name__", "unknown")
-            finally:
-                del frame
-        return logging.getLogger(name)
+
+    if name is None:
+        # Get the calling module name
+        frame = inspect.currentframe()
+        try:
+            name = frame.f_back.f_globals.get("__name__", "unknown")
+        finally:
+            del frame
+    return logging.getLogger(name)
 
 
 def get_request_logger() -> logging.Logger:
@@ -226,6 +316,40 @@ def get_database_logger() -> logging.Logger:
     return get_logger("database")
 
 
+def is_enabled_for(logger: logging.Logger, level: int) -> bool:
+    """Check whether a logger would emit records at the given level.
+
+    structlog's own bound loggers (used when it is not configured on top of
+    stdlib) have no ``isEnabledFor`` and filter records themselves, so they
+    are treated as enabled.
+
+    Args:
+        logger: Logger instance
+        level: Standard logging level, e.g. logging.INFO
+    """
+    is_enabled = getattr(logger, "isEnabledFor", None)
+    return is_enabled is None or is_enabled(level)
+
+
+def _emit(logger: logging.Logger, message: str, fields: Dict[str, Any], method: str = "info", **log_kwargs) -> None:
+    """Emit a structured log record through whichever backend the logger uses.
+
+    structlog loggers take the fields as event keys; stdlib loggers get them
+    via ``extra``.
+
+    Args:
+        logger: Logger instance
+        message: Log message
+        fields: Structured context for the record
+        method: Logger method to call (e.g. 'info', 'error')
+        **log_kwargs: Extra keyword arguments for the logger call, such as exc_info
+    """
+    if structlog is not None and isinstance(logger, structlog.stdlib.BoundLogger):
+        getattr(logger, method)(message, **log_kwargs, **fields)
+    else:
+        getattr(logger, method)(message, extra=fields, **log_kwargs)
+
+
 def log_function_entry(logger: logging.Logger, func_name: str, args: Dict[str, Any] = None, **kwargs) -> None:
     """Log function entry with parameters.
 
@@ -235,14 +359,10 @@ def log_function_entry(logger: logging.Logger, func_name: str, args: Dict[str, A
         args: Function arguments (will be redacted)
         **kwargs: Additional context
     """
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.info(f"Entering function {func_name}", func_name=func_name, args=args, **kwargs)
-        else:
-            logger.info(f"Entering function {func_name}", extra={"func_name": func_name, "args": args, **kwargs})
-    except ImportError:
-        logger.info(f"Entering function {func_name}", extra={"func_name": func_name, "args": args, **kwargs})
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
+    _emit(logger, f"Entering function {func_name}", {"func_name": func_name, "args": args, **kwargs})
 
 
 def log_function_exit(logger: logging.Logger, func_name: str, result: Any = None, duration_ms: float = None, **kwargs) -> None:
@@ -255,22 +375,14 @@ def log_function_exit(logger: logging.Logger, func_name: str, result: Any = None
         duration_ms: Function execution duration in milliseconds
         **kwargs: Additional context
     """
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
     log_data = {"func_name": func_name, "duration_ms": duration_ms, **kwargs}
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            if result is not None:
-                log_data["result"] = result
-            logger.info(f"Exiting function {func_name}", **log_data)
-        else:
-            if result is not None:
-                log_data["result"] = result
-            logger.info(f"Exiting function {func_name}", extra=log_data)
-    except ImportError:
-        if result is not None:
-            log_data["result"] = result
-        logger.info(f"Exiting function {func_name}", extra=log_data)
+    if result is not None:
+        log_data["result"] = result
+    _emit(logger, f"Exiting function {func_name}", log_data)
 
 
 def log_error(logger: logging.Logger, error: Exception, context: Dict[str, Any] = None, **kwargs) -> None:
@@ -282,6 +394,9 @@ def log_error(logger: logging.Logger, error: Exception, context: Dict[str, Any]
         context: Additional context
         **kwargs: Additional key-value pairs
     """
+    if not is_enabled_for(logger, logging.ERROR):
+        return
+
     error_data = {
         "error_type": type(error).__name__,
         "error_message": str(error),
@@ -289,14 +404,7 @@ def log_error(logger: logging.Logger, error: Exception, context: Dict[str, Any]
         **kwargs
     }
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.error("Error occurred", exc_info=error, **error_data)
-        else:
-            logger.error("Error occurred", exc_info=error, extra=error_data)
-    except ImportError:
-        logger.error("Error occurred", exc_info=error, extra=error_data)
+    _emit(logger, "Error occurred", error_data, method="error", exc_info=error)
 
 
 def log_api_request(logger: logging.Logger, method: str, path: str, status_code: int = None,
@@ -312,6 +420,9 @@ def log_api_request(logger: logging.Logger, method: str, path: str, status_code:
         user_id: User identifier
         **kwargs: Additional context
     """
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
     log_data = {
         "method": method,
         "path": path,
@@ -321,14 +432,7 @@ def log_api_request(logger: logging.Logger, method: str, path: str, status_code:
         **kwargs
     }
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.info("API request", **log_data)
-        else:
-            logger.info("API request", extra=log_data)
-    except ImportError:
-        logger.info("API request", extra=log_data)
+    _emit(logger, "API request", log_data)
 
 
 def log_ocr_operation(logger: logging.Logger, engine: str, operation: str, document_id: str = None,
@@ -344,6 +448,9 @@ def log_ocr_operation(logger: logging.Logger, engine: str, operation: str, docum
         duration_ms: Operation duration in milliseconds
         **kwargs: Additional context
     """
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
     log_data = {
         "engine": engine,
         "operation": operation,
@@ -353,14 +460,7 @@ def log_ocr_operation(logger: logging.Logger, engine: str, operation: str, docum
         **kwargs
     }
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.info("OCR operation", **log_data)
-        else:
-            logger.info("OCR operation", extra=log_data)
-    except ImportError:
-        logger.info("OCR operation", extra=log_data)
+    _emit(logger, "OCR operation", log_data)
 
 
 def log_workflow_step(logger: logging.Logger, workflow: str, step: str, status: str,
@@ -375,6 +475,9 @@ def log_workflow_step(logger: logging.Logger, workflow: str, step: str, status:
         step_id: Unique step identifier
         **kwargs: Additional context
     """
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
     log_data = {
         "workflow": workflow,
         "step": step,
@@ -383,14 +486,7 @@ def log_workflow_step(logger: logging.Logger, workflow: str, step: str, status:
         **kwargs
     }
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.info(f"Workflow step {status}", **log_data)
-        else:
-            logger.info(f"Workflow step {status}", extra=log_data)
-    except ImportError:
-        logger.info(f"Workflow step {status}", extra=log_data)
+    _emit(logger, f"Workflow step {status}", log_data)
 
 
 def log_performance_metric(logger: logging.Logger, metric_name: str, value: float,
@@ -404,6 +500,9 @@ def log_performance_metric(logger: logging.Logger, metric_name: str, value: floa
         unit: Unit of measurement
         **kwargs: Additional context
     """
+    if not is_enabled_for(logger, logging.INFO):
+        return
+
     log_data = {
         "metric_name": metric_name,
         "value": value,
@@ -411,14 +510,7 @@ def log_performance_metric(logger: logging.Logger, metric_name: str, value: floa
         **kwargs
     }
 
-    try:
-        import structlog
-        if isinstance(logger, structlog.stdlib.BoundLogger):
-            logger.info(f"Performance metric: {metric_name}", **log_data)
-        else:
-            logger.info(f"Performance metric: {metric_name}", extra=log_data)
-    except ImportError:
-        logger.info(f"Performance metric: {metric_name}", extra=log_data)
+    _emit(logger, f"Performance metric: {metric_name}", log_data)
 
 
 def create_context_logger(base_logger: logging.Logger, **context) -> logging.Logger:
@@ -431,14 +523,10 @@ def create_context_logger(base_logger: logging.Logger, **context) -> logging.Log
     Returns:
         Logger with persistent context
     """
-    try:
-        import structlog
-        if isinstance(base_logger, structlog.stdlib.BoundLogger):
-            return base_logger.bind(**context)
-        else:
-            # For standard logging, we create a child logger
-            return base_logger.getChild("_".join(f"{k}_{v}" for k, v in context.items()))
-    except ImportError:
+    if structlog is not None and isinstance(base_logger, structlog.stdlib.BoundLogger):
+        return base_logger.bind(**context)
+    else:
+        # For standard logging, we create a child logger
         return base_logger.getChild("_".join(f"{k}_{v}" for k, v in context.items()))
 
 
@@ -1,19 +1,69 @@
 """Metrics collection and reporting system for the application."""
 
+import sys
 import time
+import array
+import random
 import statistics
-from typing import Dict, List, Any, Optional
-from collections import defaultdict
+from typing import Deque, Dict, Any, Optional, Set
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import json
 import os
+import queue
+import atexit
+import itertools
+import threading
+import weakref
 from config import get_settings
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-@dataclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(data: Any) -> bytes:
+    """Serialize metrics data to indented JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    """Deserialize JSON bytes produced by _dumps."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Maximum number of latency samples kept per engine for percentile estimates
+LATENCY_RESERVOIR_SIZE = 2048
+
+# Seconds to wait for queued snapshots when the process exits
+WRITER_SHUTDOWN_TIMEOUT = 5.0
+
+# Queue item telling the background writer to exit
+_STOP_WRITER = object()
+
+# dataclass(slots=True) is only available from Python 3.10
+_DATACLASS_OPTIONS: Dict[str, Any] = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class OCRMetrics:
-    """Container for OCR engine metrics."""
+    """Container for OCR engine metrics.
+
+    Averages and totals are kept as running counts and sums so memory stays
+    constant for long-running processes. Latency percentiles are estimated
+    from a fixed-size uniform reservoir sample.
+    """
 
     # Request metrics
     requests: int = 0
@@ -21,18 +71,29 @@ class OCRMetrics:
     failed_requests: int = 0
 
     # Performance metrics
-    latencies_ms: List[float] = field(default_factory=list)
-    pages_processed: List[int] = field(default_factory=list)
-    words_extracted: List[int] = field(default_factory=list)
+    latency_count: int = 0
+    latency_total_ms: float = 0.0
+    latency_samples: array.array = field(default_factory=lambda: array.array('d'))
+    pages_count: int = 0
+    total_pages: int = 0
+    words_count: int = 0
+    total_words: int = 0
 
     # Cost metrics (if available)
-    costs: List[float] = field(default_factory=list)
+    cost_count: int = 0
+    total_cost: float = 0.0
 
     # Confidence metrics
-    confidence_scores: List[float] = field(default_factory=list)
+    confidence_count: int = 0
+    confidence_total: float = 0.0
+
+    # Cached to_dict() result, invalidated by every add_* call
+    _dirty: bool = field(default=True, repr=False, compare=False)
+    _cached_dict: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
 
     def add_request(self, success: bool = True) -> None:
         """Add a request to the metrics."""
+        self._dirty = True
         self.requests += 1
         if success:
             self.successful_requests += 1
@@ -41,23 +102,76 @@ class OCRMetrics:
 
     def add_latency(self, latency_ms: float) -> None:
         """Add a latency measurement."""
-        self.latencies_ms.append(latency_ms)
+        self._dirty = True
+        self.latency_count += 1
+        self.latency_total_ms += latency_ms
+
+        # Reservoir sampling (Vitter's Algorithm R)
+        if len(self.latency_samples) < LATENCY_RESERVOIR_SIZE:
+            self.latency_samples.append(latency_ms)
+        else:
+            index = random.randrange(self.latency_count)
+            if index < LATENCY_RESERVOIR_SIZE:
+                self.latency_samples[index] = latency_ms
 
     def add_pages_processed(self, pages: int) -> None:
         """Add pages processed count."""
-        self.pages_processed.append(pages)
+        self._dirty = True
+        self.pages_count += 1
+        self.total_pages += pages
 
     def add_words_extracted(self, words: int) -> None:
         """Add words extracted count."""
-        self.words_extracted.append(words)
+        self._dirty = True
+        self.words_count += 1
+        self.total_words += words
 
     def add_cost(self, cost: float) -> None:
         """Add cost measurement."""
-        self.costs.append(cost)
+        self._dirty = True
+        self.cost_count += 1
+        self.total_cost += cost
 
     def add_confidence(self, confidence: float) -> None:
         """Add confidence score."""
-        self.confidence_scores.append(confidence)
+        self._dirty = True
+        self.confidence_count += 1
+        self.confidence_total += confidence
+
+    def merge(self, other: 'OCRMetrics') -> None:
+        """Fold another set of metrics for the same engine into this one."""
+        self._dirty = True
+        self._merge_latency_samples(other)
+
+        self.requests += other.requests
+        self.successful_requests += other.successful_requests
+        self.failed_requests += other.failed_requests
+        self.latency_count += other.latency_count
+        self.latency_total_ms += other.latency_total_ms
+        self.pages_count += other.pages_count
+        self.total_pages += other.total_pages
+        self.words_count += other.words_count
+        self.total_words += other.total_words
+        self.cost_count += other.cost_count
+        self.total_cost += other.total_cost
+        self.confidence_count += other.confidence_count
+        self.confidence_total += other.confidence_total
+
+    def _merge_latency_samples(self, other: 'OCRMetrics') -> None:
+        """Combine reservoirs, weighting each side by the latencies it represents."""
+        if len(self.latency_samples) + len(other.latency_samples) <= LATENCY_RESERVOIR_SIZE:
+            self.latency_samples.extend(other.latency_samples)
+            return
+
+        total = self.latency_count + other.latency_count
+        own_share = round(LATENCY_RESERVOIR_SIZE * self.latency_count / total)
+        own_share = min(own_share, len(self.latency_samples))
+        other_share = min(LATENCY_RESERVOIR_SIZE - own_share, len(other.latency_samples))
+        own_share = min(LATENCY_RESERVOIR_SIZE - other_share, len(self.latency_samples))
+
+        merged = array.array('d', random.sample(list(self.latency_samples), own_share))
+        merged.extend(random.sample(list(other.latency_samples), other_share))
+        self.latency_samples = merged
 
     @property
     def success_rate(self) -> float:
@@ -69,38 +183,54 @@ class OCRMetrics:
     @property
     def latency_p95(self) -> float:
         """Calculate 95th percentile latency."""
-        if not self.latencies_ms:
+        sample_count = len(self.latency_samples)
+        if not sample_count:
             return 0.0
-        return statistics.quantiles(self.latencies_ms, n=100)[94] if len(self.latencies_ms) >= 20 else statistics.mean(self.latencies_ms)
+        if sample_count < 20:
+            return statistics.mean(self.latency_samples)
+
+        k = int(0.95 * (sample_count - 1))
+        if np is not None:
+            # O(n) selection instead of computing every quantile cut point
+            samples = np.frombuffer(self.latency_samples, dtype=np.float64)
+            return float(np.partition(samples, k)[k])
+        return sorted(self.latency_samples)[k]
 
     @property
     def avg_latency(self) -> float:
         """Calculate average latency."""
-        return statistics.mean(self.latencies_ms) if self.latencies_ms else 0.0
+        return self.latency_total_ms / self.latency_count if self.latency_count else 0.0
 
     @property
     def avg_pages_per_request(self) -> float:
         """Calculate average pages processed per request."""
-        return statistics.mean(self.pages_processed) if self.pages_processed else 0.0
+        return self.total_pages / self.pages_count if self.pages_count else 0.0
 
     @property
     def avg_words_per_request(self) -> float:
         """Calculate average words extracted per request."""
-        return statistics.mean(self.words_extracted) if self.words_extracted else 0.0
+        return self.total_words / self.words_count if self.words_count else 0.0
 
     @property
     def avg_cost(self) -> float:
         """Calculate average cost per request."""
-        return statistics.mean(self.costs) if self.costs else 0.0
+        return self.total_cost / self.cost_count if self.cost_count else 0.0
 
     @property
     def avg_confidence(self) -> float:
         """Calculate average confidence score."""
-        return statistics.mean(self.confidence_scores) if self.confidence_scores else 0.0
+        return self.confidence_total / self.confidence_count if self.confidence_count else 0.0
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convert metrics to dictionary format."""
-        return {
+        """Convert metrics to dictionary format.
+
+        The aggregates are only recomputed after new samples arrive; repeated
+        reads return a copy of the cached result.
+        """
+        if not self._dirty and self._cached_dict is not None:
+            return dict(self._cached_dict)
+
+        self._cached_dict = {
             "requests": self.requests,
             "successful_requests": self.successful_requests,
             "failed_requests": self.failed_requests,
@@ -111,10 +241,23 @@ class OCRMetrics:
             "avg_words_per_request": round(self.avg_words_per_request, 2),
             "avg_cost_cents": round(self.avg_cost, 4),
             "avg_confidence": round(self.avg_confidence, 2),
-            "total_pages_processed": sum(self.pages_processed),
-            "total_words_extracted": sum(self.words_extracted),
-            "total_cost_cents": round(sum(self.costs), 4),
+            "total_pages_processed": self.total_pages,
+            "total_words_extracted": self.total_words,
+            "total_cost_cents": round(self.total_cost, 4),
         }
+        self._dirty = False
+        return dict(self._cached_dict)
+
+
+class _ThreadBuckets:
+    """Metrics recorded by a single thread since the last merge."""
+
+    __slots__ = ('lock', 'metrics')
+
+    def __init__(self):
+        # Only contended while a reader is merging this thread's buckets
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, OCRMetrics] = {}
 
 
 class MetricsCollector:
@@ -132,19 +275,69 @@ class MetricsCollector:
         )
         os.makedirs(self.storage_path, exist_ok=True)
 
-        # In-memory metrics storage
-        self.ocr_metrics: Dict[str, OCRMetrics] = defaultdict(OCRMetrics)
+        # In-memory metrics storage. Requests are recorded into per-thread
+        # buckets and folded into the merged totals whenever they are read.
+        # Buckets of exited threads are queued by a finalizer on the thread
+        # and dropped after their last merge.
+        self._merged_metrics: Dict[str, OCRMetrics] = defaultdict(OCRMetrics)
+        self._merge_lock = threading.RLock()
+        self._thread_local = threading.local()
+        self._thread_buckets: Set[_ThreadBuckets] = set()
+        self._retired_buckets: Deque[_ThreadBuckets] = deque()
+        self._request_counter = itertools.count(1)
+
+        # Snapshots are persisted by a background writer so disk I/O stays
+        # off the request path. The writer starts with the first save and is
+        # recreated in forked children, which do not inherit threads.
+        self._writer_lock = threading.Lock()
+        self._save_queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        if hasattr(os, 'register_at_fork'):
+            collector_ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: _reset_collector_after_fork(collector_ref))
 
         # Load existing metrics if available
         self._load_metrics()
 
+    @property
+    def ocr_metrics(self) -> Dict[str, OCRMetrics]:
+        """Per-engine metrics, including everything recorded by other threads."""
+        with self._merge_lock:
+            retired = []
+            try:
+                while True:
+                    retired.append(self._retired_buckets.popleft())
+            except IndexError:
+                pass
+            self._thread_buckets.difference_update(retired)
+
+            for buckets in itertools.chain(self._thread_buckets, retired):
+                with buckets.lock:
+                    pending, buckets.metrics = buckets.metrics, {}
+                for engine, metrics in pending.items():
+                    self._merged_metrics[engine].merge(metrics)
+            return self._merged_metrics
+
+    def _get_thread_buckets(self) -> '_ThreadBuckets':
+        """Return the calling thread's metrics buckets, registering them on first use."""
+        buckets = getattr(self._thread_local, 'buckets', None)
+        if buckets is None:
+            buckets = _ThreadBuckets()
+            self._thread_local.buckets = buckets
+            with self._merge_lock:
+                self._thread_buckets.add(buckets)
+            # Only a lock-free append runs in the finalizer, which may fire
+            # during garbage collection on any thread
+            weakref.finalize(threading.current_thread(), self._retired_buckets.append, buckets)
+        return buckets
+
     def _load_metrics(self) -> None:
         """Load metrics from persistent storage."""
         metrics_file = os.path.join(self.storage_path, "ocr_metrics.json")
         if os.path.exists(metrics_file):
             try:
-                with open(metrics_file, 'r') as f:
-                    data = json.load(f)
+                with open(metrics_file, 'rb') as f:
+                    data = _loads(f.read())
                     for engine, metrics_data in data.items():
                         metrics = OCRMetrics()
                         # Load the data (simplified - in production you'd want more robust loading)
@@ -156,15 +349,118 @@ class MetricsCollector:
                 print(f"Warning: Could not load metrics from {metrics_file}: {e}")
 
     def _save_metrics(self) -> None:
-        """Save metrics to persistent storage."""
+        """Queue a snapshot of the current metrics for persistence."""
+        with self._merge_lock:
+            snapshot = {engine: metrics.to_dict() for engine, metrics in self.ocr_metrics.items()}
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(
+                    target=self._writer_loop,
+                    args=(self._save_queue,),
+                    name="metrics-writer",
+                    daemon=True
+                )
+                self._writer_thread.start()
+            self._save_queue.put_nowait(snapshot)
+
+    def _writer_loop(self, save_queue: "queue.Queue[Any]") -> None:
+        """Persist queued snapshots, coalescing bursts to the latest one.
+
+        Besides snapshots the queue carries flush events, set once everything
+        queued before them is written, and the stop sentinel.
+        """
+        while True:
+            items = [save_queue.get()]
+            try:
+                while True:
+                    items.append(save_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            data = None
+            stop = False
+            waiters = []
+            for item in items:
+                if item is _STOP_WRITER:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    data = item
+
+            try:
+                if data is not None:
+                    self._write_metrics(data)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+            if stop:
+                return
+
+    def _write_metrics(self, data: Dict[str, Any]) -> None:
+        """Atomically write a metrics snapshot to persistent storage."""
         metrics_file = os.path.join(self.storage_path, "ocr_metrics.json")
+        tmp_file = metrics_file + ".tmp"
         try:
-            data = {engine: metrics.to_dict() for engine, metrics in self.ocr_metrics.items()}
-            with open(metrics_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(data))
+            os.replace(tmp_file, metrics_file)
         except Exception as e:
             print(f"Warning: Could not save metrics to {metrics_file}: {e}")
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued metrics snapshots have been written.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the queue was drained, False if the timeout expired
+        """
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                return True
+            done = threading.Event()
+            self._save_queue.put_nowait(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = WRITER_SHUTDOWN_TIMEOUT) -> bool:
+        """Write any queued snapshots and stop the background writer.
+
+        A later save starts a new writer, so closing is safe to repeat.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the writer stopped, False if the timeout expired
+        """
+        with self._writer_lock:
+            writer, self._writer_thread = self._writer_thread, None
+            if writer is None or not writer.is_alive():
+                return True
+            self._save_queue.put_nowait(_STOP_WRITER)
+        writer.join(timeout)
+        return not writer.is_alive()
+
+    def _reset_after_fork(self) -> None:
+        """Drop writer and per-thread state inherited from the parent process.
+
+        Only the forking thread survives in the child, so locks held by other
+        parent threads would never be released and the writer is gone. The
+        parent's unmerged buckets stay with the parent; the child starts with
+        fresh ones.
+        """
+        self._merge_lock = threading.RLock()
+        self._thread_local = threading.local()
+        self._thread_buckets = set()
+        # New deque rather than clear(): finalizers of parent threads still
+        # append to the old one
+        self._retired_buckets = deque()
+        self._writer_lock = threading.Lock()
+        self._save_queue = queue.Queue()
+        self._writer_thread = None
+
     def record_ocr_request(
         self,
         engine: str,
@@ -186,22 +482,26 @@ class MetricsCollector:
             cost: Cost in cents
             confidence: Confidence score (0-100)
         """
-        metrics = self.ocr_metrics[engine]
-        metrics.add_request(success=success)
-
-        if latency_ms is not None:
-            metrics.add_latency(latency_ms)
-        if pages is not None:
-            metrics.add_pages_processed(pages)
-        if words is not None:
-            metrics.add_words_extracted(words)
-        if cost is not None:
-            metrics.add_cost(cost)
-        if confidence is not None:
-            metrics.add_confidence(confidence)
+        buckets = self._get_thread_buckets()
+        with buckets.lock:
+            metrics = buckets.metrics.get(engine)
+            if metrics is None:
+                metrics = buckets.metrics[engine] = OCRMetrics()
+            metrics.add_request(success=success)
+
+            if latency_ms is not None:
+                metrics.add_latency(latency_ms)
+            if pages is not None:
+                metrics.add_pages_processed(pages)
+            if words is not None:
+                metrics.add_words_extracted(words)
+            if cost is not None:
+                metrics.add_cost(cost)
+            if confidence is not None:
+                metrics.add_confidence(confidence)
 
         # Save metrics periodically (every 10 requests)
-        if metrics.requests % 10 == 0:
+        if next(self._request_counter) % 10 == 0:
             self._save_metrics()
 
     def get_ocr_metrics(self, engine: Optional[str] = None) -> Dict[str, Any]:
@@ -213,18 +513,22 @@ class MetricsCollector:
         Returns:
             Dictionary containing metrics data
         """
-        if engine:
-            metrics = self.ocr_metrics.get(engine, OCRMetrics())
-            return {engine: metrics.to_dict()}
+        with self._merge_lock:
+            if engine:
+                metrics = self.ocr_metrics.get(engine, OCRMetrics())
+                return {engine: metrics.to_dict()}
 
-        return {engine: metrics.to_dict() for engine, metrics in self.ocr_metrics.items()}
+            return {engine: metrics.to_dict() for engine, metrics in self.ocr_metrics.items()}
 
     def get_system_metrics(self) -> Dict[str, Any]:
         """Get system-wide metrics."""
-        total_requests = sum(m.requests for m in self.ocr_metrics.values())
-        total_successful = sum(m.successful_requests for m in self.ocr_metrics.values())
-        total_failed = sum(m.failed_requests for m in self.ocr_metrics.values())
-        total_cost = sum(sum(m.costs) for m in self.ocr_metrics.values())
+        with self._merge_lock:
+            ocr_metrics = self.ocr_metrics
+            total_requests = sum(m.requests for m in ocr_metrics.values())
+            total_successful = sum(m.successful_requests for m in ocr_metrics.values())
+            total_failed = sum(m.failed_requests for m in ocr_metrics.values())
+            total_cost = sum(m.total_cost for m in ocr_metrics.values())
+            engines_count = len(ocr_metrics)
 
         return {
             "total_requests": total_requests,
@@ -232,7 +536,7 @@ class MetricsCollector:
             "total_failed_requests": total_failed,
             "overall_success_rate": round((total_successful / total_requests * 100) if total_requests > 0 else 0, 2),
             "total_cost_cents": round(total_cost, 4),
-            "engines_count": len(self.ocr_metrics),
+            "engines_count": engines_count,
             "last_updated": datetime.utcnow().isoformat(),
         }
 
@@ -242,10 +546,11 @@ class MetricsCollector:
         Args:
             engine: Specific engine name, or None to reset all
         """
-        if engine:
-            self.ocr_metrics[engine] = OCRMetrics()
-        else:
-            self.ocr_metrics.clear()
+        with self._merge_lock:
+            if engine:
+                self.ocr_metrics[engine] = OCRMetrics()
+            else:
+                self.ocr_metrics.clear()
         self._save_metrics()
 
     def cleanup_old_data(self, days: int = 30) -> None:
@@ -259,6 +564,13 @@ class MetricsCollector:
         pass
 
 
+def _reset_collector_after_fork(collector_ref: 'weakref.ReferenceType[MetricsCollector]') -> None:
+    """Fork hook; holds the collector weakly so it can still be collected."""
+    collector = collector_ref()
+    if collector is not None:
+        collector._reset_after_fork()
+
+
 # Global metrics collector instance
 _metrics_collector: Optional[MetricsCollector] = None
 
@@ -268,6 +580,7 @@ def get_metrics_collector() -> MetricsCollector:
     global _metrics_collector
     if _metrics_collector is None:
         _metrics_collector = MetricsCollector()
+        atexit.register(_metrics_collector.close)
     return _metrics_collector
 
 
@@ -306,6 +619,8 @@ def record_ocr_metrics(
 class MetricsTimer:
     """Context manager for timing operations and recording metrics."""
 
+    __slots__ = ('engine', 'start_ns', 'pages', 'words', 'cost', 'confidence', 'success')
+
     def __init__(self, engine: str):
         """Initialize timer for an OCR engine.
 
@@ -313,7 +628,7 @@ class MetricsTimer:
             engine: OCR engine name
         """
         self.engine = engine
-        self.start_time: Optional[float] = None
+        self.start_ns: Optional[int] = None
         self.pages: Optional[int] = None
         self.words: Optional[int] = None
         self.cost: Optional[float] = None
@@ -322,13 +637,14 @@ class MetricsTimer:
 
     def __enter__(self):
         """Start timing."""
-        self.start_time = time.time()
+        self.start_ns = time.perf_counter_ns()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Stop timing and record metrics."""
-        if self.start_time is not None:
-            latency_ms = (time.time() - self.start_time) * 1000
+        if self.start_ns is not None:
+            # Monotonic clock, so NTP adjustments cannot skew or negate latency
+            latency_ms = (time.perf_counter_ns() - self.start_ns) / 1_000_000
             self.success = exc_type is None
 
             record_ocr_metrics(
@@ -8,36 +8,142 @@ command organization.
 """
 
 import ast
+import contextlib
+import functools
+import io
+import json
 import os
+import re
 import sys
+import tempfile
 
-def validate_cli_structure():
-    """Validate the CLI structure by parsing the cli.py file."""
+CLI_PATH = "cli.py"
+# Kept outside the work tree so files committed to the repository cannot
+# pose as a previous run's result
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "validate_cli",
+)
+RESULT_CACHE_FILE = os.path.join(CACHE_DIR, "last_result.json")
+
+# '@app.command()', '@labels_app.command(', '@watch_app.command(' and
+# '@metrics_app.command(' matched in a single scan of the source
+COMMAND_DECORATOR_RE = re.compile(rb'@(?:app\.command\(\)|(?:labels_app|watch_app|metrics_app)\.command\()')
+
+# Substrings the text-based checks look for, matched against the raw file
+# bytes. Plain `in` tests are used on
+# purpose: for a handful of literals they beat a combined regex scan.
+HELP_PATTERNS = (b'This command', b'Examples:', b'python cli.py', b'help=')
+ERROR_PATTERNS = (b'try:', b'except', b'typer.Exit(1)', b'logger.error', b'typer.secho')
+CONFIRMATION_PATTERNS = (b'typer.confirm', b'--dry-run', b'--confirm')
+
+# Names validate_cli_structure requires; missing ones are reported sorted
+_REQUIRED_IMPORTS = frozenset({'typer', 'uvicorn', 'subprocess', 'os'})
+_REQUIRED_COMMANDS = frozenset({
+    'labels_list', 'labels_ensure', 'labels_assign',
+    'watch_start', 'watch_stop', 'watch_status',
+    'metrics_dump', 'metrics_summary'
+})
+_APP_NAMES = frozenset({'app', 'labels_app', 'watch_app', 'metrics_app'})
+
+def _stat_key(cli_path=CLI_PATH):
+    """Return the (mtime_ns, size) pairs of cli.py and this script.
     
-    cli_path = "cli.py"
-    if not os.path.exists(cli_path):
-        print("❌ cli.py file not found")
-        return False
+    Like the .pyc check, a single stat() stands in for reading and hashing
+    the file; including the validator itself invalidates cached results
+    when the checks change. The absolute path keeps checkouts apart in the
+    shared cache directory.
+    """
+    cli_stat = os.stat(cli_path)
+    own_stat = os.stat(__file__)
+    return [
+        cli_stat.st_mtime_ns, cli_stat.st_size, own_stat.st_mtime_ns, own_stat.st_size,
+        os.path.abspath(cli_path),
+    ]
+
+def _load_cached_result(key):
+    """Return the (report, exit_code) of a previous run with the same stat key."""
+    try:
+        with open(RESULT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['key'] == key:
+            return cached['report'], cached['exit_code']
+    except Exception:
+        pass
+    return None
+
+def _save_cached_result(key, report, exit_code):
+    """Record this run's report so an unchanged cli.py can skip validation."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'report': report, 'exit_code': exit_code}, f)
+            os.replace(tmp_file, RESULT_CACHE_FILE)
+        except Exception:
+            os.unlink(tmp_file)
+            raise
+    except Exception:
+        pass
+
+@functools.lru_cache(maxsize=1)
+def _load_cli(cli_path=CLI_PATH, mtime_ns=None, size=None):
+    """Read and parse cli.py once, returning its raw bytes and AST.
+    
+    The text checks run directly on the bytes, so the file is never decoded
+    into a separate str copy. mtime_ns and size only key the in-process
+    cache, so an edited file is re-read on the next call.
+    """
+    with open(cli_path, 'rb') as f:
+        data = f.read()
+    
+    # Pin the grammar to the running interpreter and skip type-comment
+    # tokenization, which none of the checks use
+    tree = ast.parse(
+        data,
+        filename=cli_path,
+        mode="exec",
+        type_comments=False,
+        feature_version=sys.version_info[:2],
+    )
+    return data, tree
+
+def validate_cli_structure(content, tree):
+    """Validate the CLI structure using the parsed cli.py source."""
     
     try:
-        with open(cli_path, 'r') as f:
-            content = f.read()
-        
-        # Parse the AST
-        tree = ast.parse(content)
-        
-        # Check for required imports
-        required_imports = ['typer', 'uvicorn', 'subprocess', 'os']
-        found_imports = []
+        # Collect imports, app assignments, functions and command decorators
+        # in a single pass over the tree
+        found_imports = set()
+        created_apps = set()
+        found_functions = set()
+        decorator_count = 0
         
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
-                    found_imports.append(alias.name)
+                    found_imports.add(alias.name)
             elif isinstance(node, ast.ImportFrom):
-                found_imports.append(node.module)
+                found_imports.add(node.module)
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id in _APP_NAMES:
+                        created_apps.add(target.id)
+            elif isinstance(node, ast.FunctionDef):
+                found_functions.add(node.name)
+                for decorator in node.decorator_list:
+                    # Check for @app.command(), @labels_app.command(), etc.
+                    if isinstance(decorator, ast.Call):
+                        if isinstance(decorator.func, ast.Attribute):
+                            if decorator.func.attr == 'command':
+                                decorator_count += 1
+                    elif isinstance(decorator, ast.Attribute):
+                        if decorator.attr == 'command':
+                            decorator_count += 1
         
-        missing_imports = [imp for imp in required_imports if imp not in found_imports]
+        # Check for required imports
+        missing_imports = sorted(_REQUIRED_IMPORTS - found_imports)
         if missing_imports:
             print(f"❌ Missing imports: {missing_imports}")
             return False
@@ -45,84 +151,32 @@ def validate_cli_structure():
             print("✅ All required imports found")
         
         # Check for Typer app creation
-        app_created = False
-        labels_app_created = False
-        watch_app_created = False
-        metrics_app_created = False
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        if target.id == 'app':
-                            app_created = True
-                        elif target.id == 'labels_app':
-                            labels_app_created = True
-                        elif target.id == 'watch_app':
-                            watch_app_created = True
-                        elif target.id == 'metrics_app':
-                            metrics_app_created = True
-        
-        if app_created:
+        if 'app' in created_apps:
             print("✅ Main Typer app created")
         else:
             print("❌ Main Typer app not found")
             return False
         
-        if labels_app_created and watch_app_created and metrics_app_created:
+        if created_apps >= {'labels_app', 'watch_app', 'metrics_app'}:
             print("✅ All sub-applications created")
         else:
             print("❌ Missing sub-applications")
             return False
         
         # Check for command functions
-        required_commands = [
-            'labels_list', 'labels_ensure', 'labels_assign',
-            'watch_start', 'watch_stop', 'watch_status',
-            'metrics_dump', 'metrics_summary'
-        ]
-        
-        found_functions = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                found_functions.append(node.name)
-        
-        missing_commands = [cmd for cmd in required_commands if cmd not in found_functions]
+        missing_commands = sorted(_REQUIRED_COMMANDS - found_functions)
         if missing_commands:
             print(f"❌ Missing command functions: {missing_commands}")
             return False
         else:
             print("✅ All required command functions found")
         
-        # Check for decorators (command decorators)
-        decorator_count = 0
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                for decorator in node.decorator_list:
-                    # Check for @app.command(), @labels_app.command(), etc.
-                    if isinstance(decorator, ast.Call):
-                        if isinstance(decorator.func, ast.Attribute):
-                            if decorator.func.attr == 'command':
-                                decorator_count += 1
-                    elif isinstance(decorator, ast.Attribute):
-                        if decorator.attr == 'command':
-                            decorator_count += 1
-        
         # Also check string content for command decorators since AST might miss some patterns
-        command_decorator_patterns = [
-            '@app.command()',
-            '@labels_app.command(',
-            '@watch_app.command(',
-            '@metrics_app.command('
-        ]
-        
-        string_decorator_count = 0
-        for pattern in command_decorator_patterns:
-            string_decorator_count += content.count(pattern)
+        string_decorator_count = len(COMMAND_DECORATOR_RE.findall(content))
         
         total_decorators = max(decorator_count, string_decorator_count)
         
-        if total_decorators >= len(required_commands):
+        if total_decorators >= len(_REQUIRED_COMMANDS):
             print(f"✅ Command decorators found ({total_decorators})")
         else:
             print(f"❌ Insufficient command decorators ({total_decorators})")
@@ -134,97 +188,54 @@ def validate_cli_structure():
         print(f"❌ Error parsing cli.py: {e}")
         return False
 
-def validate_command_help_text():
+def validate_command_help_text(content):
     """Check that commands have proper help text and examples."""
     
-    cli_path = "cli.py"
     try:
-        with open(cli_path, 'r') as f:
-            content = f.read()
-        
         # Check for help text patterns
-        help_patterns = [
-            'This command',
-            'Examples:',
-            'python cli.py',
-            'help='
-        ]
-        
-        found_patterns = []
-        for pattern in help_patterns:
-            if pattern in content:
-                found_patterns.append(pattern)
+        missing = [p for p in HELP_PATTERNS if p not in content]
         
-        if len(found_patterns) == len(help_patterns):
+        if not missing:
             print("✅ Help text patterns found")
             return True
         else:
-            missing = [p for p in help_patterns if p not in found_patterns]
-            print(f"❌ Missing help text patterns: {missing}")
+            print(f"❌ Missing help text patterns: {[p.decode() for p in missing]}")
             return False
             
     except Exception as e:
         print(f"❌ Error checking help text: {e}")
         return False
 
-def validate_error_handling():
+def validate_error_handling(content):
     """Check for proper error handling patterns."""
     
-    cli_path = "cli.py"
     try:
-        with open(cli_path, 'r') as f:
-            content = f.read()
-        
         # Check for error handling patterns
-        error_patterns = [
-            'try:',
-            'except',
-            'typer.Exit(1)',
-            'logger.error',
-            'typer.secho'
-        ]
-        
-        found_patterns = []
-        for pattern in error_patterns:
-            if pattern in content:
-                found_patterns.append(pattern)
+        found_patterns = [p for p in ERROR_PATTERNS if p in content]
         
         if len(found_patterns) >= 4:  # We expect most patterns
             print("✅ Error handling patterns found")
             return True
         else:
-            print(f"❌ Insufficient error handling patterns: {found_patterns}")
+            print(f"❌ Insufficient error handling patterns: {[p.decode() for p in found_patterns]}")
             return False
             
     except Exception as e:
         print(f"❌ Error checking error handling: {e}")
         return False
 
-def validate_confirmation_prompts():
+def validate_confirmation_prompts(content):
     """Check for confirmation prompts on destructive operations."""
     
-    cli_path = "cli.py"
     try:
-        with open(cli_path, 'r') as f:
-            content = f.read()
-        
         # Check for confirmation patterns
-        confirmation_patterns = [
-            'typer.confirm',
-            '--dry-run',
-            '--confirm'
-        ]
-        
-        found_patterns = []
-        for pattern in confirmation_patterns:
-            if pattern in content:
-                found_patterns.append(pattern)
+        found_patterns = [p for p in CONFIRMATION_PATTERNS if p in content]
         
         if len(found_patterns) >= 2:  # We expect confirmation and dry-run
             print("✅ Confirmation prompt patterns found")
             return True
         else:
-            print(f"❌ Missing confirmation patterns: {found_patterns}")
+            print(f"❌ Missing confirmation patterns: {[p.decode() for p in found_patterns]}")
             return False
             
     except Exception as e:
@@ -232,28 +243,63 @@ def validate_confirmation_prompts():
         return False
 
 def main():
-    """Run all validation checks."""
+    """Run all validation checks, replaying the last report if cli.py is unchanged."""
+    
+    try:
+        key = _stat_key(CLI_PATH)
+    except OSError:
+        key = None
+    
+    if key is not None:
+        cached = _load_cached_result(key)
+        if cached is not None:
+            report, exit_code = cached
+            print(report, end="")
+            return exit_code
+    
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        exit_code = _run_checks(key)
+    report = buffer.getvalue()
+    print(report, end="")
+    
+    if key is not None:
+        _save_cached_result(key, report, exit_code)
+    return exit_code
+
+def _run_checks(key):
+    """Run every check against cli.py, printing the report as it goes."""
     
     print("🔍 Validating Admin CLI Commands Implementation (Task 23)")
     print("=" * 60)
     
-    all_passed = True
-    
     print("\n📋 Checking CLI Structure...")
-    if not validate_cli_structure():
-        all_passed = False
+    if not os.path.exists(CLI_PATH):
+        print("❌ cli.py file not found")
+        return 1
     
-    print("\n📝 Checking Help Text...")
-    if not validate_command_help_text():
-        all_passed = False
+    # Read and parse cli.py once; every check below reuses the result
+    try:
+        content, tree = _load_cli(CLI_PATH, *(key[:2] if key else ()))
+    except Exception as e:
+        print(f"❌ Error parsing cli.py: {e}")
+        return 1
     
-    print("\n🛡️ Checking Error Handling...")
-    if not validate_error_handling():
-        all_passed = False
+    # Stop at the first failing check; later checks add nothing once the
+    # overall result is known
+    all_passed = validate_cli_structure(content, tree)
     
-    print("\n⚠️ Checking Confirmation Prompts...")
-    if not validate_confirmation_prompts():
-        all_passed = False
+    if all_passed:
+        print("\n📝 Checking Help Text...")
+        all_passed = validate_command_help_text(content)
+    
+    if all_passed:
+        print("\n🛡️ Checking Error Handling...")
+        all_passed = validate_error_handling(content)
+    
+    if all_passed:
+        print("\n⚠️ Checking Confirmation Prompts...")
+        all_passed = validate_confirmation_prompts(content)
     
     print("\n" + "=" * 60)
     
@@ -1,13 +1,13 @@
 """Base task classes for Celery with logging and error handling."""
 
 import time
-from typing import Any, Dict, Optional, Union
-from datetime import datetime
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
 
 from celery import Task
 from celery.exceptions import Retry
 
-from utils.logging import get_logger
+from utils.logging import get_logger, is_enabled_for
 from config import get_settings
 
 # Get settings
@@ -27,21 +27,40 @@ class BaseTask(Task):
     """
 
     abstract = True
-    autoretry_for = (Exception,)
+    # Only transient failures are retried automatically; deterministic errors
+    # (TypeError, ValueError, ...) fail straight away instead of burning the
+    # retry budget on backoff sleeps. OSError covers ConnectionError,
+    # TimeoutError and network failures such as socket.gaierror.
+    autoretry_for = (OSError,)
+    # Subclasses of autoretry_for entries that fail the same way on every
+    # attempt. Celery 5.2 has no native support for this, so retry()
+    # enforces it.
+    dont_autoretry_for = (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)
     retry_backoff = True
     retry_backoff_max = 600  # 10 minutes
     retry_kwargs = {'max_retries': 3}
     time_limit = 600  # 10 minutes
     soft_time_limit = 300  # 5 minutes
 
+    # Logger category inserted after "celery.task." for this class family
+    _log_prefix = ""
+    _task_logger = get_logger("celery.task.BaseTask")
+
+    def __init_subclass__(cls, **kwargs):
+        """Resolve the per-class logger once instead of per instance."""
+        super().__init_subclass__(**kwargs)
+        cls._task_logger = get_logger(f"celery.task.{cls._log_prefix}{cls.__name__}")
+
     def __init__(self):
         """Initialize the base task."""
-        self.start_time = None
-        self.task_logger = get_logger(f"celery.task.{self.__class__.__name__}")
+        self.task_logger = type(self)._task_logger
 
     def on_success(self, retval, task_id, args, kwargs):
         """Handle successful task completion."""
-        execution_time = time.time() - self.start_time if self.start_time else 0
+        if not is_enabled_for(self.task_logger, logging.INFO):
+            return
+
+        execution_time = self._execution_time()
 
         self.task_logger.info(
             "Task completed successfully",
@@ -56,32 +75,44 @@ class BaseTask(Task):
 
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """Handle task failure."""
-        execution_time = time.time() - self.start_time if self.start_time else 0
+        max_retries = self._max_retries
+        current_retry = getattr(self.request, 'retries', 0)
 
-        self.task_logger.error(
-            "Task failed",
-            task_id=task_id,
-            task_name=self.name,
-            execution_time_seconds=round(execution_time, 2),
-            exception_type=type(exc).__name__,
-            exception_message=str(exc),
-            args_count=len(args),
-            kwargs_keys=list(kwargs.keys()) if kwargs else [],
-            max_retries=self.retry_kwargs.get('max_retries', 0),
-            current_retry=getattr(self.request, 'retries', 0),
-            status="failed"
-        )
+        # Only build the log fields when the record will actually be emitted
+        if is_enabled_for(self.task_logger, logging.ERROR):
+            execution_time = self._execution_time()
 
-        # Move to dead-letter queue if max retries exceeded
-        max_retries = self.retry_kwargs.get('max_retries', 0)
-        current_retry = getattr(self.request, 'retries', 0)
+            self.task_logger.error(
+                "Task failed",
+                task_id=task_id,
+                task_name=self.name,
+                execution_time_seconds=round(execution_time, 2),
+                exception_type=type(exc).__name__,
+                exception_message=str(exc),
+                args_count=len(args),
+                kwargs_keys=list(kwargs.keys()) if kwargs else [],
+                max_retries=max_retries,
+                current_retry=current_retry,
+                status="failed"
+            )
 
-        if current_retry >= max_retries:
+        # Move to dead-letter queue if max retries exceeded or the error is
+        # not one that would have been retried
+        if current_retry >= max_retries or not self._is_retryable(exc):
             self._move_to_dead_letter_queue(task_id, exc, args, kwargs, einfo)
 
+    def retry(self, args=None, kwargs=None, exc=None, **options):
+        """Retry the task unless exc is listed in dont_autoretry_for."""
+        if exc is not None and isinstance(exc, self.dont_autoretry_for):
+            raise exc
+        return super().retry(args=args, kwargs=kwargs, exc=exc, **options)
+
     def on_retry(self, exc, task_id, args, kwargs, einfo):
         """Handle task retry."""
-        execution_time = time.time() - self.start_time if self.start_time else 0
+        if not is_enabled_for(self.task_logger, logging.WARNING):
+            return
+
+        execution_time = self._execution_time()
 
         self.task_logger.warning(
             "Task retrying",
@@ -91,23 +122,28 @@ class BaseTask(Task):
             exception_type=type(exc).__name__,
             exception_message=str(exc),
             current_retry=getattr(self.request, 'retries', 0),
-            max_retries=self.retry_kwargs.get('max_retries', 0),
+            max_retries=self._max_retries,
             status="retrying"
         )
 
     def __call__(self, *args, **kwargs):
         """Execute the task with timing and error handling."""
-        self.start_time = time.time()
+        # Celery shares task instances between invocations, so the start
+        # time lives on the per-call request context rather than on self
+        self.request._base_start_perf = time.perf_counter()
 
-        self.task_logger.info(
-            "Task started",
-            task_id=self.request.id,
-            task_name=self.name,
-            args_count=len(args),
-            kwargs_keys=list(kwargs.keys()) if kwargs else [],
-            queue=self.request.delivery_info.get('routing_key', 'unknown') if self.request.delivery_info else 'unknown',
-            status="started"
-        )
+        if is_enabled_for(self.task_logger, logging.INFO):
+            request = self.request
+            delivery_info = request.delivery_info
+            self.task_logger.info(
+                "Task started",
+                task_id=request.id,
+                task_name=self.name,
+                args_count=len(args),
+                kwargs_keys=list(kwargs.keys()) if kwargs else [],
+                queue=delivery_info.get('routing_key', 'unknown') if delivery_info else 'unknown',
+                status="started"
+            )
 
         try:
             result = super().__call__(*args, **kwargs)
@@ -123,6 +159,20 @@ class BaseTask(Task):
             )
             raise
 
+    @property
+    def _max_retries(self) -> int:
+        """Retry limit autoretry applies, read at use so later overrides count."""
+        return self.retry_kwargs.get('max_retries', self.max_retries)
+
+    def _is_retryable(self, exc: Exception) -> bool:
+        """Whether autoretry would have retried exc."""
+        return isinstance(exc, self.autoretry_for) and not isinstance(exc, self.dont_autoretry_for)
+
+    def _execution_time(self) -> float:
+        """Seconds elapsed since the current invocation started."""
+        start = getattr(self.request, '_base_start_perf', None)
+        return time.perf_counter() - start if start is not None else 0
+
     def update_progress(self, current: int, total: int, message: str = ""):
         """Update task progress."""
         if total > 0:
@@ -155,8 +205,6 @@ class BaseTask(Task):
     def _move_to_dead_letter_queue(self, task_id: str, exc: Exception, args: tuple, kwargs: dict, einfo: Any):
         """Move failed task to dead-letter queue."""
         try:
-            from workers.celery_app import celery_app
-
             dead_letter_data = {
                 'original_task_id': task_id,
                 'task_name': self.name,
@@ -165,12 +213,12 @@ class BaseTask(Task):
                 'exception_type': type(exc).__name__,
                 'exception_message': str(exc),
                 'traceback': str(einfo),
-                'failed_at': datetime.utcnow().isoformat(),
+                'failed_at': time.time(),  # Unix epoch seconds (UTC)
                 'retries': getattr(self.request, 'retries', 0),
             }
 
-            # Send to dead-letter queue
-            celery_app.send_task(
+            # Send to dead-letter queue via the app this task is bound to
+            self.app.send_task(
                 'app.tasks.handle_failed_task',
                 args=[dead_letter_data],
                 queue='failed_tasks',
@@ -201,15 +249,11 @@ class IOBoundTask(BaseTask):
     """
 
     abstract = True
+    _log_prefix = "io."
     time_limit = 1200  # 20 minutes (longer for I/O operations)
     soft_time_limit = 900  # 15 minutes
     retry_backoff_max = 300  # 5 minutes (shorter backoff for I/O issues)
 
-    def __init__(self):
-        """Initialize I/O bound task."""
-        super().__init__()
-        self.task_logger = get_logger(f"celery.task.io.{self.__class__.__name__}")
-
 
 class CPUBoundTask(BaseTask):
     """Base task for CPU bound operations.
@@ -219,15 +263,11 @@ class CPUBoundTask(BaseTask):
     """
 
     abstract = True
+    _log_prefix = "cpu."
     time_limit = 1800  # 30 minutes (longer for CPU-intensive tasks)
     soft_time_limit = 1500  # 25 minutes
     retry_backoff_max = 900  # 15 minutes (longer backoff for CPU issues)
 
-    def __init__(self):
-        """Initialize CPU bound task."""
-        super().__init__()
-        self.task_logger = get_logger(f"celery.task.cpu.{self.__class__.__name__}")
-
 
 class APITask(IOBoundTask):
     """Base task for external API calls.
@@ -237,16 +277,12 @@ class APITask(IOBoundTask):
     """
 
     abstract = True
+    _log_prefix = "api."
     autoretry_for = (Exception, TimeoutError, ConnectionError)
     retry_backoff_max = 600  # 10 minutes
     time_limit = 300  # 5 minutes (APIs shouldn't take longer)
     soft_time_limit = 180  # 3 minutes
 
-    def __init__(self):
-        """Initialize API task."""
-        super().__init__()
-        self.task_logger = get_logger(f"celery.task.api.{self.__class__.__name__}")
-
     def on_retry(self, exc, task_id, args, kwargs, einfo):
         """Enhanced retry logic for API tasks."""
         super().on_retry(exc, task_id, args, kwargs, einfo)
@@ -271,14 +307,12 @@ class DocumentProcessingTask(CPUBoundTask):
     """
 
     abstract = True
+    _log_prefix = "doc."
     time_limit = 3600  # 1 hour (document processing can be long)
     soft_time_limit = 3000  # 50 minutes
-    autoretry_for = (Exception, FileNotFoundError, PermissionError)
-
-    def __init__(self):
-        """Initialize document processing task."""
-        super().__init__()
-        self.task_logger = get_logger(f"celery.task.doc.{self.__class__.__name__}")
+    # Documents may be locked briefly by the process writing them, so
+    # PermissionError is retried here
+    dont_autoretry_for = (FileNotFoundError, IsADirectoryError, NotADirectoryError)
 
 
 class BatchProcessingTask(BaseTask):
@@ -289,44 +323,66 @@ class BatchProcessingTask(BaseTask):
     """
 
     abstract = True
+    _log_prefix = "batch."
     time_limit = 7200  # 2 hours (batch operations can be very long)
     soft_time_limit = 6000  # 100 minutes
     chunk_size = 100  # Default chunk size for batch processing
-
-    def __init__(self):
-        """Initialize batch processing task."""
-        super().__init__()
-        self.task_logger = get_logger(f"celery.task.batch.{self.__class__.__name__}")
+    progress_update_interval = 1.0  # Minimum seconds between progress updates
 
     def process_batch(self, items: list, batch_size: Optional[int] = None) -> Dict[str, Any]:
         """Process items in batches with progress tracking."""
         if not items:
             return {'processed': 0, 'failed': 0, 'results': []}
 
-        batch_size = batch_size or self.chunk_size
         results = []
+        extend_results = results.extend
         processed = 0
         failed = 0
 
+        for batch, batch_results in self.iter_process_batch(items, batch_size):
+            if batch_results is None:
+                failed += len(batch)
+            else:
+                extend_results(batch_results)
+                processed += len(batch_results)
+
+        return {
+            'processed': processed,
+            'failed': failed,
+            'total': len(items),
+            'results': results
+        }
+
+    def iter_process_batch(
+        self, items: list, batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[list, Optional[list]]]:
+        """Process items chunk by chunk, yielding each chunk with its results.
+
+        Lets callers stream results (e.g. straight into a database writer)
+        instead of holding every result in memory. Failed chunks are logged
+        and yielded with ``None`` results.
+        """
+        batch_size = batch_size or self.chunk_size
         total_items = len(items)
 
+        # Resolve per-chunk callables and settings once, outside the loop
+        process_chunk = self.process_batch_chunk
+        update_progress = self.update_progress
+        log_error = self.task_logger.error
+        update_interval = self.progress_update_interval
+        monotonic = time.monotonic
+
+        last_update = monotonic()
+
         for i in range(0, total_items, batch_size):
             batch = items[i:i + batch_size]
             batch_start = i + 1
             batch_end = min(i + batch_size, total_items)
 
-            self.update_progress(
-                batch_start,
-                total_items,
-                f"Processing batch {batch_start}-{batch_end} of {total_items}"
-            )
-
             try:
-                batch_results = self.process_batch_chunk(batch)
-                results.extend(batch_results)
-                processed += len(batch_results)
+                batch_results = process_chunk(batch)
             except Exception as exc:
-                self.task_logger.error(
+                log_error(
                     "Batch processing failed",
                     task_id=self.request.id,
                     task_name=self.name,
@@ -334,14 +390,20 @@ class BatchProcessingTask(BaseTask):
                     batch_end=batch_end,
                     exception=str(exc)
                 )
-                failed += len(batch)
+                batch_results = None
+
+            # Report items handled so far, at most once per interval (plus the
+            # final chunk), since every update is a result backend round-trip
+            now = monotonic()
+            if batch_end == total_items or now - last_update >= update_interval:
+                update_progress(
+                    batch_end,
+                    total_items,
+                    f"Processed batch {batch_start}-{batch_end} of {total_items}"
+                )
+                last_update = now
 
-        return {
-            'processed': processed,
-            'failed': failed,
-            'total': total_items,
-            'results': results
-        }
+            yield batch, batch_results
 
     def process_batch_chunk(self, batch: list) -> list:
         """Process a single batch chunk. Override in subclasses."""